@@ -0,0 +1,133 @@
+"""Kontrola dopuszczenia (admission control) dla analizy zdjęć.
+
+Analiza to najdroższy krok (GPU/CPU). Zamiast uruchamiać ją równolegle we
+wszystkich sesjach, ograniczamy liczbę jednoczesnych analiz semaforem,
+a nadmiar czeka w uczciwej kolejce FIFO z limitem na użytkownika.
+Po przekroczeniu głębokości kolejki nowe żądania są odrzucane od razu,
+dzięki czemu opóźnienia ogona pozostają ograniczone.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+ANALYSIS_CONCURRENCY = int(os.environ.get('GOZ_ANALYSIS_CONCURRENCY', '2'))
+ANALYSIS_QUEUE_DEPTH = int(os.environ.get('GOZ_ANALYSIS_QUEUE_DEPTH', '20'))
+ANALYSIS_PER_USER = int(os.environ.get('GOZ_ANALYSIS_PER_USER', '1'))
+INITIAL_SERVICE_TIME = 4.0
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Żądanie odrzucone przez kontrolę dopuszczenia"""
+
+
+class QueueFull(AdmissionRejected):
+    pass
+
+
+class UserLimitExceeded(AdmissionRejected):
+    pass
+
+
+class Ticket:
+    """Miejsce w kolejce jednego żądania analizy"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.released = False
+        self._granted = threading.Event()
+
+    @property
+    def granted(self):
+        return self._granted.is_set()
+
+
+class AdmissionController:
+    """Ograniczona współbieżność + uczciwa kolejka FIFO"""
+
+    def __init__(self, max_concurrent=ANALYSIS_CONCURRENCY, max_queue_depth=ANALYSIS_QUEUE_DEPTH,
+                 per_user_limit=ANALYSIS_PER_USER, initial_service_time=INITIAL_SERVICE_TIME):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.per_user_limit = per_user_limit
+        self.avg_service_time = initial_service_time
+        self._lock = threading.Lock()
+        self._waiting = deque()
+        self._active = 0
+        self._per_user = Counter()
+        self.rejected = 0
+
+    def submit(self, user_id):
+        """Zarejestruj żądanie; zwraca Ticket albo rzuca AdmissionRejected"""
+        with self._lock:
+            if self._per_user[user_id] >= self.per_user_limit:
+                self.rejected += 1
+                raise UserLimitExceeded("Twoja poprzednia analiza jest jeszcze w toku. Poczekaj na jej wynik.")
+            ticket = Ticket(user_id)
+            if self._active < self.max_concurrent and not self._waiting:
+                self._grant(ticket)
+            elif len(self._waiting) >= self.max_queue_depth:
+                self.rejected += 1
+                raise QueueFull("Serwis analizy jest teraz przeciążony. Spróbuj ponownie za kilka minut.")
+            else:
+                self._waiting.append(ticket)
+            self._per_user[user_id] += 1
+            return ticket
+
+    def _grant(self, ticket):
+        self._active += 1
+        ticket.started_at = time.monotonic()
+        ticket._granted.set()
+
+    def wait(self, ticket, timeout=None):
+        """Czekaj na przydział miejsca; True gdy można zaczynać"""
+        return ticket._granted.wait(timeout)
+
+    def position(self, ticket):
+        """Pozycja w kolejce (1 = następny), 0 gdy już przydzielono miejsce"""
+        with self._lock:
+            if ticket.granted:
+                return 0
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def eta(self, ticket):
+        """Szacowany czas oczekiwania w sekundach"""
+        position = self.position(ticket)
+        if position == 0:
+            return 0.0
+        return math.ceil(position / self.max_concurrent) * self.avg_service_time
+
+    def release(self, ticket):
+        """Zwolnij miejsce (lub wycofaj z kolejki) i wpuść następnego"""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._per_user[ticket.user_id] -= 1
+            if self._per_user[ticket.user_id] <= 0:
+                del self._per_user[ticket.user_id]
+            if not ticket.granted:
+                self._waiting.remove(ticket)
+                return
+            elapsed = time.monotonic() - ticket.started_at
+            self.avg_service_time += EWMA_ALPHA * (elapsed - self.avg_service_time)
+            self._active -= 1
+            while self._waiting and self._active < self.max_concurrent:
+                self._grant(self._waiting.popleft())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': self._active,
+                'waiting': len(self._waiting),
+                'rejected': self.rejected,
+                'avg_service_time': round(self.avg_service_time, 2)
+            }
@@ -0,0 +1,166 @@
+"""Przyrostowe agregaty operacyjne dla panelu administracyjnego.
+
+Każde zdarzenie (analiza, wyświetlenie partnera, zamówienie) aktualizuje
+od razu liczniki całkowite i godzinowe kubełki (rollupy). Panel czyta
+wyłącznie te agregaty, więc koszt odświeżenia to O(kubełki), a nie O(zamówienia).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+ANALYTICS_DB_PATH = os.environ.get('GOZ_ANALYTICS_DB', 'analytics.sqlite3')
+BUCKET_SECONDS = 3600
+RETENTION_BUCKETS = 24 * 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    metric TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, dim)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    bucket INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, metric, dim)
+);
+"""
+
+_UPSERT = """
+INSERT INTO {table} ({keys}, count, total) VALUES ({marks}, 1, ?)
+ON CONFLICT ({keys}) DO UPDATE SET count = count + 1, total = total + excluded.total
+"""
+_UPSERT_COUNTER = _UPSERT.format(table='counters', keys='metric, dim', marks='?, ?')
+_UPSERT_ROLLUP = _UPSERT.format(table='rollups', keys='bucket, metric, dim', marks='?, ?, ?')
+
+# Punkty GOZ.AI za sposób dostarczenia do recyklingu
+RECYCLING_POINTS = {
+    'recycle_confirmation_courier': 5,
+    'recycle_confirmation_personal': 10
+}
+
+
+class MetricsStore:
+    """Liczniki i godzinowe rollupy w SQLite (wspólne dla wszystkich workerów)"""
+
+    def __init__(self, path=ANALYTICS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._pruned_bucket = None
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def record(self, events, now=None):
+        """Zapisz zdarzenia [(metric, dim, value)] w jednej transakcji"""
+        bucket = int((now or time.time()) // BUCKET_SECONDS)
+        db = self._connect()
+        db.execute('BEGIN')
+        try:
+            db.executemany(_UPSERT_COUNTER, [(metric, dim, value) for metric, dim, value in events])
+            db.executemany(_UPSERT_ROLLUP, [(bucket, metric, dim, value) for metric, dim, value in events])
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        if bucket != self._pruned_bucket:
+            # Retencja raz na nowy kubełek (na proces) - nie przy każdym zapisie
+            self._pruned_bucket = bucket
+            self.prune(now)
+
+    def record_analysis(self, analysis, now=None, reused=False):
+        """Analiza do liczników; ponowny skan (wynik z indeksu zdjęć) nie zmienia średniej wyceny"""
+        events = [
+            ('analyses', 'reused' if reused else '', 1),
+            ('action', analysis['action'], 1)
+        ]
+        if not reused:
+            events.append(('estimated_value', analysis['category'], analysis['estimated_value']))
+        self.record(events, now)
+
+    def record_impressions(self, kind, partner_names, now=None):
+        """Partnerzy pokazani użytkownikowi (mianownik konwersji)"""
+        self.record([('impression', f"{kind}:{name}", 1) for name in partner_names], now)
+
+    def record_order(self, kind, partner_name, page, now=None):
+        events = [('order', f"{kind}:{partner_name}", 1), ('delivery', page, 1)]
+        points = RECYCLING_POINTS.get(page)
+        if points:
+            events.append(('points', '', points))
+        self.record(events, now)
+
+    def prune(self, now=None):
+        """Usuń kubełki starsze niż okres retencji"""
+        oldest = int((now or time.time()) // BUCKET_SECONDS) - RETENTION_BUCKETS
+        self._connect().execute("DELETE FROM rollups WHERE bucket < ?", (oldest,))
+
+    # ============================================
+    # ODCZYT DLA PANELU
+    # ============================================
+
+    def _window(self, metric, hours, now):
+        first = int((now or time.time()) // BUCKET_SECONDS) - hours + 1
+        return self._connect().execute(
+            "SELECT bucket, dim, count, total FROM rollups WHERE metric = ? AND bucket >= ?",
+            (metric, first)
+        ).fetchall()
+
+    def totals(self, metric):
+        rows = self._connect().execute(
+            "SELECT dim, count, total FROM counters WHERE metric = ?", (metric,)
+        ).fetchall()
+        return {dim: (count, total) for dim, count, total in rows}
+
+    def analyses_per_hour(self, hours=24, now=None):
+        """Lista (początek godziny, nowe analizy, ponowne skany) dla ostatnich `hours` godzin"""
+        counts = {}
+        for bucket, dim, count, _ in self._window('analyses', hours, now):
+            counts[(bucket, dim)] = count
+        last = int((now or time.time()) // BUCKET_SECONDS)
+        return [
+            (bucket * BUCKET_SECONDS, counts.get((bucket, ''), 0), counts.get((bucket, 'reused'), 0))
+            for bucket in range(last - hours + 1, last + 1)
+        ]
+
+    def action_mix(self, hours=24, now=None):
+        mix = {}
+        for _, dim, count, _ in self._window('action', hours, now):
+            mix[dim] = mix.get(dim, 0) + count
+        return mix
+
+    def avg_value_by_category(self, hours=24, now=None):
+        sums = {}
+        for _, dim, count, total in self._window('estimated_value', hours, now):
+            c, t = sums.get(dim, (0, 0.0))
+            sums[dim] = (c + count, t + total)
+        return {dim: t / c for dim, (c, t) in sums.items() if c}
+
+    def partner_conversion(self, hours=24, now=None):
+        """{(typ, partner): (wyświetlenia, zamówienia, konwersja)}"""
+        shown, ordered = {}, {}
+        for _, dim, count, _ in self._window('impression', hours, now):
+            shown[dim] = shown.get(dim, 0) + count
+        for _, dim, count, _ in self._window('order', hours, now):
+            ordered[dim] = ordered.get(dim, 0) + count
+        result = {}
+        for dim in shown.keys() | ordered.keys():
+            kind, _, name = dim.partition(':')
+            views, orders = shown.get(dim, 0), ordered.get(dim, 0)
+            result[(kind, name)] = (views, orders, orders / views if views else 0.0)
+        return result
+
+    def points_awarded(self, hours=24, now=None):
+        return sum(total for _, _, _, total in self._window('points', hours, now))
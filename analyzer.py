@@ -0,0 +1,71 @@
+"""Analiza zdjęcia produktu (w pilotażu: symulacja modelu uszkodzeń).
+
+Docelowo tu ładowany jest model (Bielik / model wizyjny). `warm_up` wykonuje
+inicjalizację backendu i jedną próbną inferencję, żeby pierwszy użytkownik
+na świeżym workerze nie płacił za ładowanie.
+"""
+
+import random
+from datetime import datetime
+
+from catalog import get_catalog
+
+UNKNOWN_PRODUCT = {
+    "name": "Nieznany produkt",
+    "brand": "Nieznana marka",
+    "market_value": 2000,
+    "common_damage": ["general_damage"],
+    "category": "electronics"
+}
+
+
+def fake_ai_analyze(image_data, rng=random, products=None):
+    """Symuluj analize AI (rng: źródło losowości, domyślnie globalny random)"""
+    if products is None:
+        products = get_catalog().get('products', [])
+
+    if not products:
+        product = UNKNOWN_PRODUCT
+    else:
+        product = rng.choice(products)
+
+    damage_type = rng.choice(product.get('common_damage', ["general_damage"]))
+    damage_level = rng.randint(1, 8)
+
+    # Logika biznesowa
+    if damage_level <= 2:
+        action = "SPRZEDAJ"
+        action_text = "SPRZEDAJ"
+    elif damage_level <= 5:
+        action = "NAPRAW"
+        action_text = "NAPRAW"
+    else:
+        action = "ZUTYLIZUJ"
+        action_text = "ZUTYLIZUJ"
+
+    repair_cost = rng.randint(200, 800) if action == "NAPRAW" else 0
+    market_value = product.get('market_value', 2000)
+    estimated_value = max(0, market_value - (damage_level * 150))
+
+    return {
+        'product_name': product.get('name', 'Nieznany produkt'),
+        'brand': product.get('brand', 'Nieznana marka'),
+        'category': product.get('category', 'electronics'),
+        'damage_level': damage_level,
+        'damage_type': damage_type.replace('_', ' ').title(),
+        'action': action,
+        'action_text': action_text,
+        'repair_cost': repair_cost,
+        'market_value': market_value,
+        'estimated_value': estimated_value,
+        'confidence': round(rng.uniform(0.85, 0.99), 2),
+        'dpp_uuid': f"PL-{rng.randint(10000, 99999)}-DPP",
+        'analysis_date': datetime.now().isoformat()
+    }
+
+
+def warm_up():
+    """Zainicjalizuj backend i wykonaj próbną inferencję (wynik jest odrzucany)"""
+    from PIL import Image  # dekodowanie zdjęć - ładowane przy starcie, nie przy pierwszym uploadzie
+    Image.init()
+    return fake_ai_analyze(b'', random.Random(0))
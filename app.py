@@ -1,31 +1,42 @@
 import streamlit as st
 import time
+import tracemalloc
 import pandas as pd
 import random
 from datetime import datetime
-from fpdf import FPDF
 import json
 import os
-import io
+import functools
+import hashlib
+import html
+import secrets
+import uuid
+from contextlib import contextmanager, nullcontext
+from streamlit.runtime.media_file_manager import MediaFileManager
+from admission import AdmissionController, AdmissionRejected
+from analytics import MetricsStore
+from analyzer import fake_ai_analyze
+from blob_store import BlobStore
+from catalog import get_catalog, get_category_color, get_category_emoji, get_category_name, get_partner_rankers
+from courier import CourierService, build_shipment, future_result
+from image_index import DUPLICATE_POLICY, ImageIndex, image_hashes
+from memory_diagnostics import MEMORY_DIAGNOSTICS, MemoryDiagnostics, count_sessions, read_rss
+from notifications import Outbox, OutboxWorker
+from passport_pdf import DownloadDirectory, PassportPdfFiles
+from passports import PassportStore
+from payload import MEASURE_PAYLOAD, PayloadMeter
+from session_recording import RECORDINGS_DIR, SessionRecorder
+from shared_cache import create_cache
+from tracing import TRACE_PATH, SessionTracer, TraceExporter
+from warmup import ensure_warm
 
 # ============================================
-# FAKE DATABASE LOADER
+# KATALOG
 # ============================================
 
-def load_fake_data():
-    """Załaduj dane z fake_data.json"""
-    if os.path.exists('fake_data.json'):
-        with open('fake_data.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {
-        "products": [],
-        "repair_shops": [],
-        "buyers": [],
-        "recyclers": []
-    }
-
-# Załaduj dane
-fake_data = load_fake_data()
+# Katalog i indeksy są wspólne dla procesu (ładowane przy rozgrzewce)
+ensure_warm()
+fake_data = get_catalog()
 PRODUCTS_DB = fake_data.get('products', [])
 REPAIR_SHOPS = fake_data.get('repair_shops', [])
 BUYERS = fake_data.get('buyers', [])
@@ -35,6 +46,16 @@ RECYCLERS = fake_data.get('recyclers', [])
 # KONFIGURACJA STRONY
 # ============================================
 
+USER_EMAIL = os.environ.get('GOZ_USER_EMAIL', 'jan.kowalski@example.pl')
+USER_PHONE = os.environ.get('GOZ_USER_PHONE', '+48600100200')
+USER_LOCATION = (52.1935, 21.0340)  # Warszawa, Mokotow
+TOP_K_PARTNERS = 10
+LABELS_DIR = os.environ.get('GOZ_LABELS_DIR', 'labels')
+# Panel operacyjny tylko po podaniu tego tokenu (bez GOZ_ADMIN_TOKEN panel jest wyłączony)
+ADMIN_TOKEN = os.environ.get('GOZ_ADMIN_TOKEN', '')
+# st.download_button z funkcją zamiast danych (nowsze wersje Streamlit)
+DEFERRED_DOWNLOADS = hasattr(MediaFileManager, 'add_deferred')
+
 st.set_page_config(
     page_title="GOZ.AI Pilot",
     page_icon="♻️",
@@ -42,129 +63,113 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+@st.cache_resource
+def get_payload_meter():
+    """Licznik bajtów wysyłanych do przeglądarki (GOZ_MEASURE_PAYLOAD=1)"""
+    return PayloadMeter()
+
+if MEASURE_PAYLOAD:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    script_ctx = get_script_run_ctx()
+    if script_ctx is not None:
+        get_payload_meter().attach(script_ctx, st.session_state.get('current_page', 'main'), st.session_state)
+
+@st.cache_resource
+def get_memory_diagnostics():
+    """Snapshoty tracemalloc i próbki RSS (GOZ_MEMORY_DIAGNOSTICS=1)"""
+    return MemoryDiagnostics()
+
+if MEMORY_DIAGNOSTICS:
+    get_memory_diagnostics().begin_run(st.session_state.get('current_page', 'main'), st.session_state)
+
 # ============================================
 # STYLING (CSS)
 # ============================================
 
-st.markdown("""
-<style>
-    .main {
-        background-color: #f8fafc;
-    }
-    .stButton>button {
-        width: 100%;
-        border-radius: 12px;
-        height: 3em;
-        background-color: #10b981;
-        color: white;
-        font-weight: bold;
-        border: none;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-    }
-    .stButton>button:hover {
-        background-color: #059669;
-        color: white;
-    }
-    .status-card {
-        padding: 20px;
-        border-radius: 15px;
-        background-color: white;
-        border: 1px solid #e2e8f0;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
-        margin-bottom: 20px;
-    }
-    .metric-value {
-        font-size: 1.5rem;
-        font-weight: bold;
-        color: #0f172a;
-    }
-    .metric-label {
-        font-size: 0.8rem;
-        color: #64748b;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-    }
-    h1 { color: #0f172a; }
-    h3 { color: #334155; }
-    .shop-card {
-        padding: 15px;
-        border-radius: 10px;
-        background-color: #f1f5f9;
-        margin: 10px 0;
-        border-left: 4px solid #10b981;
-    }
-    .buyer-card {
-        padding: 15px;
-        border-radius: 10px;
-        background-color: #eff6ff;
-        margin: 10px 0;
-        border-left: 4px solid #3b82f6;
-    }
-    .recycler-card {
-        padding: 15px;
-        border-radius: 10px;
-        background-color: #f0fdf4;
-        margin: 10px 0;
-        border-left: 4px solid #10b981;
-    }
-    .delivery-option {
-        padding: 20px;
-        border-radius: 12px;
-        border: 2px solid #e2e8f0;
-        margin: 15px 0;
-        background-color: white;
-        transition: all 0.3s ease;
-    }
-    .delivery-option:hover {
-        border-color: #10b981;
-        box-shadow: 0 4px 12px rgba(16, 185, 129, 0.1);
-    }
-    .delivery-title {
-        font-size: 1.2em;
-        font-weight: bold;
-        color: #0f172a;
-        margin-bottom: 10px;
-    }
-    .delivery-desc {
-        font-size: 0.9em;
-        color: #64748b;
-        margin-bottom: 15px;
-    }
-    .category-badge {
-        display: inline-block;
-        padding: 4px 10px;
-        border-radius: 15px;
-        font-size: 0.75em;
-        font-weight: bold;
-        margin-right: 5px;
-        margin-bottom: 5px;
-    }
-    .cat-electronics {
-        background-color: #dbeafe;
-        color: #1e40af;
-    }
-    .cat-furniture {
-        background-color: #fed7aa;
-        color: #92400e;
-    }
-    .cat-appliance {
-        background-color: #d1fae5;
-        color: #065f46;
-    }
-    .confirmation-box {
-        padding: 20px;
-        border-radius: 12px;
-        background-color: #f0fdf4;
-        border-left: 5px solid #10b981;
-        margin: 20px 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'goz.css')
+
+@st.cache_resource
+def get_stylesheet_markup():
+    """Link do statycznego arkusza CSS (cache przeglądarki) lub CSS inline, gdy serwowanie statyczne jest wyłączone"""
+    if st.get_option('server.enableStaticServing'):
+        return '<link rel="stylesheet" href="app/static/goz.css">'
+    with open(STYLESHEET_PATH, encoding='utf-8') as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(get_stylesheet_markup(), unsafe_allow_html=True)
 
 # ============================================
 # SESSION STATE
 # ============================================
 
+# Klucze stanu sesji współdzielone między workerami (przetrwają reconnect na inny proces)
+PERSISTED_SESSION_KEYS = (
+    'current_page',
+    'analysis_result',
+    'selected_shop',
+    'selected_buyer',
+    'selected_recycler',
+    'shipment_request',
+    'analysis_upload_id'
+)
+
+@st.cache_resource
+def get_shared_cache():
+    """Cache współdzielony przez wszystkie procesy (backend z GOZ_CACHE_URL)"""
+    return create_cache()
+
+# Sekret przeglądarki w ciasteczku - stan z cache odtwarza tylko przeglądarka, która go zapisała
+BROWSER_COOKIE = 'goz_browser'
+BROWSER_COOKIE_MAX_AGE = 365 * 24 * 3600
+# st.context.cookies (nowsze wersje Streamlit); bez niego sesje nie są odtwarzane
+BROWSER_COOKIES = hasattr(st, 'context')
+
+def browser_owner():
+    """Skrót sekretu przeglądarki; przy pierwszej wizycie sekret jest losowany i zapisywany w ciasteczku"""
+    token = st.context.cookies.get(BROWSER_COOKIE) if BROWSER_COOKIES else None
+    if not token or len(token) != 32:
+        token = secrets.token_hex(16)
+        if BROWSER_COOKIES:
+            script = (f"<script>document.cookie = '{BROWSER_COOKIE}={token}; path=/; max-age={BROWSER_COOKIE_MAX_AGE}; "
+                      f"SameSite=Strict' + (location.protocol === 'https:' ? '; Secure' : '');</script>")
+            # Ramka HTML ma ten sam origin co aplikacja, więc ustawia jej ciasteczko
+            if hasattr(st, 'iframe'):
+                st.iframe(script, height=1)
+            else:
+                import streamlit.components.v1 as components
+                components.html(script, height=0)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def restore_session_state(session_id):
+    """Odtwórz stan sesji zapisany przez inny worker; False gdy brak stanu lub należy do innej przeglądarki"""
+    saved = get_shared_cache().get(f"session:{session_id}")
+    if not saved or saved.get('owner') != st.session_state.browser_owner:
+        return False
+    for key in PERSISTED_SESSION_KEYS:
+        if key in saved:
+            st.session_state[key] = saved[key]
+    return True
+
+def save_session_state():
+    """Zapisz stan sesji w cache (tylko gdy się zmienił)"""
+    snapshot = {key: st.session_state.get(key) for key in PERSISTED_SESSION_KEYS}
+    snapshot['owner'] = st.session_state.browser_owner
+    fingerprint = json.dumps(snapshot, sort_keys=True, default=str)
+    if st.session_state.get('persisted_fingerprint') != fingerprint:
+        get_shared_cache().set(f"session:{st.session_state.session_id}", snapshot)
+        st.session_state.persisted_fingerprint = fingerprint
+
+if 'session_id' not in st.session_state:
+    # Identyfikator w URL pozwala odnaleźć sesję karty po przełączeniu na inny worker. Link
+    # skopiowany do innej przeglądarki nie pasuje do jej ciasteczka - dostaje nową sesję
+    # i nie nadpisuje stanu właściciela.
+    st.session_state.browser_owner = browser_owner()
+    session_id = st.query_params.get('sid')
+    if not (session_id and restore_session_state(session_id)):
+        session_id = uuid.uuid4().hex
+        st.query_params['sid'] = session_id
+    st.session_state.session_id = session_id
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'main'
 if 'analysis_result' not in st.session_state:
@@ -175,6 +180,110 @@ if 'selected_buyer' not in st.session_state:
     st.session_state.selected_buyer = None
 if 'selected_recycler' not in st.session_state:
     st.session_state.selected_recycler = None
+if 'shipment_future' not in st.session_state:
+    st.session_state.shipment_future = None
+if 'label_future' not in st.session_state:
+    st.session_state.label_future = None
+if 'shipment_request' not in st.session_state:
+    st.session_state.shipment_request = None
+if 'upload_generation' not in st.session_state:
+    st.session_state.upload_generation = 0
+if 'analysis_upload_id' not in st.session_state:
+    st.session_state.analysis_upload_id = None
+if 'is_admin' not in st.session_state:
+    st.session_state.is_admin = False
+if 'rng_seed' not in st.session_state:
+    st.session_state.rng_seed = int(os.environ.get('GOZ_SESSION_SEED') or random.SystemRandom().randrange(2 ** 32))
+if 'rng' not in st.session_state:
+    # Ziarno per sesja: analiza i identyfikatory są powtarzalne przy odtwarzaniu nagrania
+    st.session_state.rng = random.Random(st.session_state.rng_seed)
+if 'recorder' not in st.session_state:
+    st.session_state.recorder = (
+        SessionRecorder(RECORDINGS_DIR, st.session_state.session_id, st.session_state.rng_seed)
+        if RECORDINGS_DIR else None
+    )
+
+@st.cache_resource
+def get_trace_exporter():
+    """Wspólny plik OTLP/JSON z trace'ami ścieżek przedmiotów (GOZ_TRACE_PATH)"""
+    return TraceExporter(TRACE_PATH)
+
+if 'tracer' not in st.session_state:
+    st.session_state.tracer = SessionTracer(get_trace_exporter(), st.session_state.session_id) if TRACE_PATH else None
+if st.session_state.tracer is not None:
+    st.session_state.tracer.begin_run(st.session_state.current_page, st.session_state.analysis_result is not None)
+
+rng = st.session_state.rng
+
+def tracked_button(label, **kwargs):
+    """st.button, który przy włączonym nagrywaniu zapisuje kliknięcie"""
+    clicked = st.button(label, **kwargs)
+    if clicked and st.session_state.recorder is not None:
+        st.session_state.recorder.record('click', st.session_state.current_page, label=label, key=kwargs.get('key'))
+    if clicked and st.session_state.tracer is not None:
+        st.session_state.tracer.action(label)
+    return clicked
+
+def end_trace_run():
+    """Zamknij span przebiegu - od teraz liczy się czas namysłu użytkownika"""
+    if st.session_state.tracer is not None:
+        st.session_state.tracer.end_run()
+
+def end_memory_run():
+    """Zamknij pomiar pamięci przebiegu (GOZ_MEMORY_DIAGNOSTICS=1)"""
+    if MEMORY_DIAGNOSTICS:
+        get_memory_diagnostics().end_run(st.session_state)
+
+def rerun():
+    """st.rerun oznaczony w trace - kolejny przebieg startuje od razu, bez czasu namysłu"""
+    if st.session_state.tracer is not None:
+        st.session_state.tracer.rerun()
+    end_memory_run()
+    st.rerun()
+
+def trace_span(name, **attributes):
+    """Etap przebiegu jako span trace'u przedmiotu (bez GOZ_TRACE_PATH nic nie robi)"""
+    if st.session_state.tracer is None:
+        return nullcontext()
+    return st.session_state.tracer.span(name, **attributes)
+
+def uploader_key():
+    return f"upload_{st.session_state.upload_generation}"
+
+def release_upload():
+    """Usuń zdjęcie z pamięci serwera i wyczyść pole uploadu (nowy klucz widgetu)"""
+    uploaded_file = st.session_state.get(uploader_key())
+    if uploaded_file is not None:
+        from streamlit import runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        script_ctx = get_script_run_ctx()
+        if runtime.exists() and script_ctx is not None:
+            runtime.get_instance().uploaded_file_mgr.remove_file(script_ctx.session_id, uploaded_file.file_id)
+    st.session_state.upload_generation += 1
+
+def clear_item_state():
+    """Zapomnij wynik analizy, wybranego partnera i zamówienie poprzedniego przedmiotu"""
+    st.session_state.analysis_result = None
+    st.session_state.analysis_upload_id = None
+    st.session_state.selected_shop = None
+    st.session_state.selected_buyer = None
+    st.session_state.selected_recycler = None
+    st.session_state.shipment_future = None
+    st.session_state.label_future = None
+    st.session_state.shipment_request = None
+
+def reset_to_main():
+    """Wróć na stronę główną i zwolnij stan poprzedniej analizy (wynik, wybory, zamówienie, zdjęcie)"""
+    if st.session_state.tracer is not None:
+        # Po potwierdzeniu trace jest już zamknięty, wcześniej to porzucenie ścieżki
+        st.session_state.tracer.finish('abandoned')
+    st.session_state.current_page = 'main'
+    clear_item_state()
+    release_upload()
+
+# Stan po poprzednim przebiegu (st.rerun przerywa skrypt przed jego końcem)
+save_session_state()
 
 # ============================================
 # SIDEBAR (MENU)
@@ -193,166 +302,307 @@ with st.sidebar:
     st.write("**Kupujacy dostepni:** " + str(len(BUYERS)))
     st.markdown("---")
     
-    if st.button("Powrót do strony głównej", use_container_width=True):
-        st.session_state.current_page = 'main'
-        st.session_state.analysis_result = None
-        st.session_state.selected_shop = None
-        st.session_state.selected_buyer = None
-        st.session_state.selected_recycler = None
-        st.rerun()
+    if ADMIN_TOKEN and not st.session_state.is_admin:
+        admin_token = st.text_input("Token administratora", type="password", key='admin_token')
+        if admin_token and secrets.compare_digest(admin_token, ADMIN_TOKEN):
+            st.session_state.is_admin = True
+        elif admin_token:
+            st.error("Nieprawidłowy token administratora")
+    
+    if st.session_state.is_admin and tracked_button("Panel operacyjny", use_container_width=True):
+        st.session_state.current_page = 'admin_dashboard'
+        rerun()
+    
+    if tracked_button("Powrót do strony głównej", use_container_width=True):
+        reset_to_main()
+        rerun()
     
     st.caption("Powered by Bielik AI & Beyond.pl")
 
+# Panel operacyjny (także odtworzony z zapisanej sesji) tylko dla administratora
+if st.session_state.current_page == 'admin_dashboard' and not st.session_state.is_admin:
+    st.session_state.current_page = 'main'
+
 # ============================================
 # FUNKCJE
 # ============================================
 
-def get_category_emoji(category):
-    """Zwróć emoji dla kategorii"""
-    emojis = {
-        "electronics": "💻",
-        "furniture": "🪑",
-        "appliance": "🍽️"
-    }
-    return emojis.get(category, "📦")
-
-def get_category_color(category):
-    """Zwróć kolor CSS dla kategorii"""
-    colors = {
-        "electronics": "cat-electronics",
-        "furniture": "cat-furniture",
-        "appliance": "cat-appliance"
-    }
-    return colors.get(category, "")
-
-def get_category_name(category):
-    """Zwróć polską nazwę kategorii"""
-    names = {
-        "electronics": "Elektronika",
-        "furniture": "Meble",
-        "appliance": "Urzadzenia"
-    }
-    return names.get(category, "Inne")
+@st.cache_resource
+def get_admission_controller():
+    """Wspólna kolejka analiz dla wszystkich sesji procesu"""
+    return AdmissionController()
 
-def filter_shops_by_category(category):
-    """Filtruj serwisy po kategorii"""
-    return [shop for shop in REPAIR_SHOPS if category in shop.get('specialization', [])]
+@contextmanager
+def analysis_slot():
+    """Poczekaj w kolejce na wolne miejsce do analizy, pokazując pozycję i ETA"""
+    controller = get_admission_controller()
+    try:
+        ticket = controller.submit(st.session_state.session_id)
+    except AdmissionRejected as e:
+        st.error(f"⛔ {e}")
+        end_trace_run()
+        end_memory_run()
+        st.stop()
+    try:
+        queue_status = st.empty()
+        with trace_span('admission_wait'):
+            while not controller.wait(ticket, timeout=0.5):
+                queue_status.info(
+                    f"⏳ Pozycja w kolejce: {controller.position(ticket)} | "
+                    f"szacowany czas oczekiwania: ok. {controller.eta(ticket):.0f} s"
+                )
+        queue_status.empty()
+        yield
+    finally:
+        # Zwolnij miejsce także gdy użytkownik przerwie (rerun) w trakcie
+        controller.release(ticket)
 
-def filter_buyers_by_category(category):
-    """Filtruj kupujacych po kategorii"""
-    return [buyer for buyer in BUYERS if buyer.get('category') == category]
+@st.cache_resource
+def get_blob_store():
+    """Wspólny magazyn zdjęć adresowany treścią"""
+    return BlobStore()
 
-def filter_recyclers_by_category(category):
-    """Filtruj recyklerow po kategorii"""
-    return [recycler for recycler in RECYCLERS if category in recycler.get('accepted', [])]
+def store_upload(uploaded_file):
+    """Zapisz zdjęcie (raz na treść) wraz z miniaturą i zwróć jego SHA-256"""
+    store = get_blob_store()
+    digest, _ = store.put(uploaded_file)
+    try:
+        store.put_thumbnail(digest)
+    except OSError:
+        # Nieobsługiwany format obrazu - zostaje sam oryginał
+        pass
+    return digest
 
-def fake_ai_analyze(image_data):
-    """Symuluj analize AI"""
-    
-    if not PRODUCTS_DB:
-        product = {
-            "name": "Nieznany produkt",
-            "brand": "Nieznana marka",
-            "market_value": 2000,
-            "common_damage": ["general_damage"],
-            "category": "electronics"
-        }
-    else:
-        product = random.choice(PRODUCTS_DB)
-    
-    damage_type = random.choice(product.get('common_damage', ["general_damage"]))
-    damage_level = random.randint(1, 8)
-    
-    # Logika biznesowa
-    if damage_level <= 2:
-        action = "SPRZEDAJ"
-        action_text = "SPRZEDAJ"
-    elif damage_level <= 5:
-        action = "NAPRAW"
-        action_text = "NAPRAW"
+@st.cache_resource
+def get_image_index():
+    """Indeks haszy perceptualnych przeanalizowanych zdjęć"""
+    return ImageIndex()
+
+def find_near_duplicate(uploaded_file):
+    """Zwróć (hasze zdjęcia, najbliższy wcześniejszy skan lub None)"""
+    try:
+        hashes = image_hashes(uploaded_file)
+    except OSError:
+        # Nie da się zdekodować obrazu - analiza bez sprawdzania duplikatów
+        return None, None
+    return hashes, get_image_index().find(hashes)
+
+@st.cache_resource
+def get_passport_store():
+    """Wspólny rejestr paszportów DPP (źródło eksportu zbiorczego)"""
+    return PassportStore()
+
+@st.cache_resource
+def get_metrics_store():
+    """Przyrostowe agregaty dla panelu operacyjnego"""
+    return MetricsStore()
+
+def record_upload(uploaded_file):
+    """Zapisz upload w nagraniu sesji (zdjęcie trafia do magazynu blobów)"""
+    recorder = st.session_state.recorder
+    if recorder is None or recorder.last_upload_id == uploaded_file.file_id:
+        return
+    digest, _ = get_blob_store().put(uploaded_file)
+    recorder.last_upload_id = uploaded_file.file_id
+    recorder.record('upload', st.session_state.current_page, sha256=digest, name=uploaded_file.name)
+
+@st.cache_resource
+def get_courier_service():
+    """Wspólny klient kuriera (pula połączeń) dla wszystkich sesji"""
+    return CourierService()
+
+def order_shipment(service, receiver_name, receiver_address):
+    """Zleć utworzenie przesyłki w tle (nie blokuje renderowania strony)"""
+    analysis = st.session_state.analysis_result
+    shipment = build_shipment(service, receiver_name, receiver_address, analysis['dpp_uuid'])
+    # Klucz losowany raz na zamówienie (DPP nie jest unikalne między sesjami); ponowione
+    # zamówienie tej samej przesyłki w sesji używa zapisanego klucza, więc nie tworzy drugiej
+    request = st.session_state.shipment_request
+    if request is not None and request['shipment'] == shipment:
+        idempotency_key = request['idempotency_key']
     else:
-        action = "ZUTYLIZUJ"
-        action_text = "ZUTYLIZUJ"
-    
-    repair_cost = random.randint(200, 800) if action == "NAPRAW" else 0
-    market_value = product.get('market_value', 2000)
-    estimated_value = max(0, market_value - (damage_level * 150))
-    
+        idempotency_key = uuid.uuid4().hex
+    st.session_state.shipment_request = {'shipment': shipment, 'idempotency_key': idempotency_key}
+    st.session_state.shipment_future = get_courier_service().create_shipment(shipment, idempotency_key)
+    st.session_state.label_future = None
+
+def get_shipment_future():
+    """Future przesyłki; po zmianie workera odtwarzany z tym samym kluczem idempotencji"""
+    request = st.session_state.shipment_request
+    if st.session_state.shipment_future is None and request:
+        st.session_state.shipment_future = get_courier_service().create_shipment(
+            request['shipment'], request['idempotency_key']
+        )
+    return st.session_state.shipment_future
+
+def get_tracking_number():
+    """Zwróć numer śledzenia lub status rejestracji przesyłki"""
+    shipment, error = future_result(get_shipment_future())
+    if shipment is not None:
+        return shipment['tracking_number']
+    if error is not None:
+        return "błąd rejestracji przesyłki"
+    return "rejestracja w toku..."
+
+def render_shipment_label():
+    """Pokaż pobieranie etykiety, gdy przesyłka i etykieta są gotowe"""
+    shipment, error = future_result(get_shipment_future())
+    if error is not None:
+        st.error(f"Nie udało się zarejestrować przesyłki: {error}")
+        return False
+    if shipment is not None:
+        get_labels_dir().maybe_sweep()
+        label_path, _ = future_result(st.session_state.label_future)
+        if label_path is not None and not os.path.exists(label_path):
+            # Etykieta usunięta po czasie życia plików - pobierz ją ponownie
+            st.session_state.label_future = None
+    if shipment is not None and st.session_state.label_future is None:
+        # Etykieta trafia strumieniem na dysk - w sesji trzymamy tylko ścieżkę
+        label_path = os.path.join(LABELS_DIR, f"{shipment['tracking_number']}.pdf")
+        st.session_state.label_future = get_courier_service().fetch_label(shipment['id'], label_path)
+
+    label_path, label_error = future_result(st.session_state.label_future)
+    if label_path is not None:
+        st.download_button(
+            label="Pobierz etykietę do wydruku",
+            data=file_download_data(label_path),
+            file_name=f"etykieta_{shipment['tracking_number']}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+        return True
+    if label_error is not None:
+        st.error(f"Nie udało się pobrać etykiety: {label_error}")
+        st.session_state.label_future = None
+    if tracked_button("Odśwież status przesyłki", use_container_width=True):
+        rerun()
+    return False
+
+@st.cache_resource
+def get_labels_dir():
+    """Katalog etykiet kuriera (pliki starsze niż GOZ_DOWNLOAD_FILE_TTL są usuwane)"""
+    return DownloadDirectory(LABELS_DIR)
+
+@st.cache_resource
+def get_passport_pdfs():
+    """Paszporty PDF renderowane raz i serwowane z dysku"""
+    return PassportPdfFiles()
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def file_download_data(path):
+    """Dane dla st.download_button z pliku
+
+    Gdy Streamlit obsługuje odroczone pobieranie, plik jest czytany dopiero
+    po kliknięciu; inaczej raz na przebieg (bez kopii w cache i stanie sesji).
+    """
+    if DEFERRED_DOWNLOADS:
+        return functools.partial(read_file, path)
+    return read_file(path)
+
+@st.cache_resource
+def get_outbox():
+    """Wspólny outbox powiadomień i jego worker w tle"""
+    outbox = Outbox()
+    worker = OutboxWorker(outbox).start()
+    return outbox, worker
+
+def send_confirmation(subject, body, sms_text=None):
+    """Zakolejkuj potwierdzenie (raz na zamówienie) - bez czekania na dostawcę"""
+    outbox, worker = get_outbox()
+    analysis = st.session_state.analysis_result
+    key = f"{st.session_state.session_id}-{analysis['dpp_uuid']}-{st.session_state.current_page}"
+    outbox.enqueue('email', USER_EMAIL, body, subject=subject, dedupe_key=f"{key}-email")
+    if sms_text:
+        outbox.enqueue('sms', USER_PHONE, sms_text, dedupe_key=f"{key}-sms")
+    worker.notify()
+
+@functools.lru_cache(maxsize=4096)
+def render_product_card(category, product_name, action_text, brand, dpp_uuid, damage_type, damage_level):
+    """HTML karty produktu (ten sam wynik = identyczny element, wysyłany jako referencja)"""
+    return f"""
+    <div class="status-card">
+        <div class="product-header">
+            <h2 class="product-title">{get_category_emoji(category)} {html.escape(str(product_name))}</h2>
+            <span class="action-pill">{html.escape(str(action_text))}</span>
+        </div>
+        <p class="product-meta">Marka: {html.escape(str(brand))} • ID: {html.escape(str(dpp_uuid))}</p>
+        <span class="category-badge {get_category_color(category)}">{get_category_name(category)}</span>
+        <hr>
+        <p><b>Diagnoza AI:</b> {html.escape(str(damage_type))} (Poziom uszkodzenia: {damage_level}/10)</p>
+    </div>
+    """
+
+@functools.lru_cache(maxsize=4096)
+def render_shop_card(name, address, rating, response_time, avg_price, specialization):
+    """HTML karty serwisu (pola z feedów partnerów są escapowane)"""
+    spec_badges = " ".join([f"<span class='category-badge {get_category_color(cat)}'>{get_category_name(cat)}</span>" for cat in specialization])
+    return f"""
+    <div class="shop-card">
+        <div class="card-row">
+            <div>
+                <b>{html.escape(name)}</b><br>
+                <small>Adres: {html.escape(address)}</small><br>
+                <small>Rating: {rating}/5.0 | Czas odpowiedzi: {html.escape(response_time)}</small><br>
+                <div class="card-badges">{spec_badges}</div>
+            </div>
+            <div class="card-price">{avg_price} PLN</div>
+        </div>
+    </div>
+    """
+
+@functools.lru_cache(maxsize=4096)
+def render_buyer_card(name, rating, delivery_time, offer_price):
+    """HTML karty kupującego"""
+    return f"""
+    <div class="buyer-card">
+        <div class="card-row centered">
+            <div>
+                <b>{html.escape(name)}</b><br>
+                <small>Rating: {rating}/5.0</small><br>
+                <small>Dostarczenie: {html.escape(delivery_time)}</small>
+            </div>
+            <div class="card-price large">{offer_price} PLN</div>
+        </div>
+    </div>
+    """
+
+@functools.lru_cache(maxsize=4096)
+def render_recycler_card(name, address, rating, certification, materials, price):
+    """HTML karty punktu recyklingu"""
+    return f"""
+    <div class="recycler-card">
+        <b>{html.escape(name)}</b><br>
+        <small>Adres: {html.escape(str(address))}</small><br>
+        <small>Rating: {rating}/5.0 | Certyfikowany: {html.escape(str(certification))}</small><br>
+        <small>Przyjmuje: {html.escape(str(materials))}</small><br>
+        <small class="recycler-price">Cena: {html.escape(str(price))}</small>
+    </div>
+    """
+
+def rank_partners(kind, category):
+    """Zwróć najlepszych partnerów kategorii i liczbę wszystkich dostępnych"""
+    ranker = get_partner_rankers()[kind]
+    return ranker.top_k(category, TOP_K_PARTNERS, origin=USER_LOCATION), ranker.count(category)
+
+def build_passport(analysis):
+    """Zbuduj rekord Cyfrowego Paszportu Produktu (DPP)"""
     return {
-        'product_name': product.get('name', 'Nieznany produkt'),
-        'brand': product.get('brand', 'Nieznana marka'),
-        'category': product.get('category', 'electronics'),
-        'damage_level': damage_level,
-        'damage_type': damage_type.replace('_', ' ').title(),
-        'action': action,
-        'action_text': action_text,
-        'repair_cost': repair_cost,
-        'market_value': market_value,
-        'estimated_value': estimated_value,
-        'confidence': round(random.uniform(0.85, 0.99), 2),
-        'dpp_uuid': f"PL-{random.randint(10000, 99999)}-DPP"
+        "uuid": analysis['dpp_uuid'],
+        "product_name": analysis['product_name'],
+        "brand": analysis['brand'],
+        "category": get_category_name(analysis['category']),
+        "damage_level": analysis['damage_level'],
+        "damage_type": analysis['damage_type'],
+        "repair_feasibility": analysis['action'] == 'NAPRAW',
+        "estimated_repair_cost": analysis['repair_cost'],
+        "confidence": analysis['confidence'],
+        "evidence_image": f"sha256:{analysis['image_sha256']}",
+        "analysis_date": analysis['analysis_date']
     }
 
-def generate_passport_pdf(analysis):
-    """Generuj cyfrowy paszport jako PDF"""
-    
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Header
-    pdf.set_fill_color(16, 185, 129)
-    pdf.rect(0, 0, 210, 50, 'F')
-    pdf.set_font("Arial", 'B', 24)
-    pdf.set_text_color(255, 255, 255)
-    pdf.cell(0, 15, txt="GOZ.AI - Paszport Cyfrowy", ln=1, align='C')
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 10, txt="CYFROWY PASZPORT PRODUKTU (DPP)", ln=1, align='C')
-    
-    # Content
-    pdf.ln(15)
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(0, 10, txt=f"Produkt: {analysis['product_name']}", ln=1)
-    
-    pdf.set_font("Arial", '', 11)
-    
-    category_name = get_category_name(analysis['category'])
-    
-    data = [
-        ("Identyfikator DPP:", analysis['dpp_uuid']),
-        ("Marka:", analysis['brand']),
-        ("Kategoria:", category_name),
-        ("Data Analizy:", datetime.now().strftime('%Y-%m-%d %H:%M')),
-        ("Poziom Uszkodzenia:", f"{analysis['damage_level']}/10"),
-        ("Typ Uszkodzenia:", analysis['damage_type']),
-        ("Rekomendacja:", analysis['action']),
-        ("Wartosc rynkowa (przed):", f"{analysis['market_value']} PLN"),
-        ("Szacunkowy koszt naprawy:", f"{analysis['repair_cost']} PLN"),
-        ("Wartosc szacunkowa (po):", f"{analysis['estimated_value']} PLN"),
-        ("Pewnosc AI:", f"{analysis['confidence']*100:.0f}%"),
-    ]
-    
-    for label, value in data:
-        pdf.set_font("Arial", 'B', 10)
-        pdf.cell(70, 8, txt=label)
-        pdf.set_font("Arial", '', 10)
-        pdf.cell(0, 8, txt=str(value), ln=1)
-    
-    # Footer
-    pdf.ln(10)
-    pdf.set_font("Arial", 'I', 8)
-    pdf.set_text_color(100, 100, 100)
-    pdf.cell(0, 5, txt="Dokument wygenerowany przez platforme GOZ.AI", ln=1, align='C')
-    pdf.cell(0, 5, txt="Hostowane: Beyond.pl DC2 Poznan | AI: Bielik-11B", ln=1, align='C')
-    
-    # Zwróć jako bytes
-    pdf_buffer = io.BytesIO()
-    pdf_bytes = pdf.output()
-    pdf_buffer.write(pdf_bytes)
-    pdf_buffer.seek(0)
-    
-    return pdf_buffer.getvalue()
-
 # ============================================
 # STRONA GŁÓWNA
 # ============================================
@@ -368,210 +618,209 @@ if st.session_state.current_page == 'main':
     st.markdown("---")
 
     st.subheader("1. Skanowanie obiektu")
-    uploaded_file = st.file_uploader("Zrób zdjęcie uszkodzonego przedmiotu", type=['jpg', 'png', 'jpeg'])
+    uploaded_file = st.file_uploader("Zrób zdjęcie uszkodzonego przedmiotu", type=['jpg', 'png', 'jpeg'], key=uploader_key())
+    analyze_btn = False
 
     if uploaded_file is not None:
+        if st.session_state.analysis_result is not None and st.session_state.analysis_upload_id != uploaded_file.file_id:
+            # Inne zdjęcie - wynik, partner i zamówienie poprzedniego przedmiotu nie mogą zostać na ekranie
+            clear_item_state()
+            save_session_state()
+        record_upload(uploaded_file)
+        if st.session_state.tracer is not None:
+            st.session_state.tracer.start(uploaded_file.file_id, image_bytes=uploaded_file.size)
         st.image(uploaded_file, caption='Podgląd z kamery', use_column_width=True)
         
-        analyze_btn = st.button("Uruchom Analize Bielik AI")
+        analyze_btn = tracked_button("Uruchom Analize Bielik AI")
         
         if analyze_btn:
-            with st.spinner('Przetwarzanie obrazu w chmurze...'):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                steps = [
-                    (10, "Normalizacja obrazu..."),
-                    (30, "Wykrywanie obiektu (YOLOv8)..."),
-                    (50, "Analiza uszkodzen (Computer Vision)..."),
-                    (70, "Pobieranie danych producenta (DPP API)..."),
-                    (85, "Generowanie wyceny naprawy..."),
-                    (100, "Gotowe!")
-                ]
-                
-                for percent, text in steps:
-                    time.sleep(random.uniform(0.4, 0.8))
-                    progress_bar.progress(percent)
-                    status_text.text(text)
-                
-                time.sleep(0.5)
-                status_text.empty()
-                progress_bar.empty()
+            with trace_span('analysis'), analysis_slot():
+                with trace_span('duplicate_lookup'):
+                    hashes, duplicate = find_near_duplicate(uploaded_file)
+                if duplicate is not None and DUPLICATE_POLICY == 'reuse':
+                    # Ten sam przedmiot był już analizowany - ta sama wycena i paszport, bez inferencji
+                    analysis = duplicate['analysis']
+                    st.info(f"Rozpoznano wcześniej zeskanowany przedmiot (DPP {duplicate['dpp_uuid']}) - "
+                            "wyświetlamy poprzednią analizę.")
+                else:
+                    with trace_span('inference'), st.spinner('Przetwarzanie obrazu w chmurze...'):
+                        progress_bar = st.progress(0)
+                        status_text = st.empty()
+                    
+                        steps = [
+                            (10, "Normalizacja obrazu..."),
+                            (30, "Wykrywanie obiektu (YOLOv8)..."),
+                            (50, "Analiza uszkodzen (Computer Vision)..."),
+                            (70, "Pobieranie danych producenta (DPP API)..."),
+                            (85, "Generowanie wyceny naprawy..."),
+                            (100, "Gotowe!")
+                        ]
+                    
+                        for percent, text in steps:
+                            time.sleep(rng.uniform(0.4, 0.8))
+                            progress_bar.progress(percent)
+                            status_text.text(text)
+                    
+                        time.sleep(0.5)
+                        status_text.empty()
+                        progress_bar.empty()
 
-            st.success("Analiza zakonczona pomyslnie!")
-            
-            # Analiza AI
-            analysis = fake_ai_analyze(uploaded_file)
+                        # Analiza AI
+                        analysis = fake_ai_analyze(uploaded_file, rng)
+
+                    st.success("Analiza zakonczona pomyslnie!")
+                
+                    with trace_span('store_upload'):
+                        analysis['image_sha256'] = store_upload(uploaded_file)
+                    if duplicate is not None:
+                        analysis['near_duplicate_of'] = duplicate['dpp_uuid']
+                        st.warning(f"Zdjęcie bardzo podobne do wcześniejszego skanu (DPP {duplicate['dpp_uuid']}) - "
+                                   "wycena oznaczona do weryfikacji.")
+                    if hashes is not None:
+                        get_image_index().add(hashes, analysis['image_sha256'], analysis)
             st.session_state.analysis_result = analysis
-            
-            # Karta Produktu
-            category_emoji = get_category_emoji(analysis['category'])
-            category_color = get_category_color(analysis['category'])
-            category_name = get_category_name(analysis['category'])
-            
-            st.markdown(f"""
-            <div class="status-card">
-                <div style="display:flex; justify-content:space-between; align-items:center;">
-                    <h2 style="margin:0; color:#1e293b;">{category_emoji} {analysis['product_name']}</h2>
-                    <span style="background:#dcfce7; color:#166534; padding:5px 12px; border-radius:20px; font-weight:bold; font-size:0.8em;">{analysis['action_text']}</span>
-                </div>
-                <p style="color:#64748b; margin-top:5px;">Marka: {analysis['brand']} • ID: {analysis['dpp_uuid']}</p>
-                <span class="category-badge {category_color}">{category_name}</span>
-                <hr style="border-top: 1px solid #e2e8f0;">
-                <p><b>Diagnoza AI:</b> {analysis['damage_type']} (Poziom uszkodzenia: {analysis['damage_level']}/10)</p>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # Metryki finansowe
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                st.metric("Koszt naprawy", f"{analysis['repair_cost']} PLN")
-            with c2:
-                st.metric("Wartosc rynkowa", f"{analysis['market_value']} PLN")
-            with c3:
-                st.metric("Pewnosc AI", f"{int(analysis['confidence']*100)}%")
-
-            # Paszport Cyfrowy
-            with st.expander("Paszport Cyfrowy Produktu (DPP)"):
-                st.info("Dane pobrane z centralnej bazy producenta i systemu GOZ.AI")
-                st.json({
-                    "uuid": analysis['dpp_uuid'],
-                    "product_name": analysis['product_name'],
-                    "brand": analysis['brand'],
-                    "category": category_name,
-                    "damage_level": analysis['damage_level'],
-                    "damage_type": analysis['damage_type'],
-                    "repair_feasibility": analysis['action'] == 'NAPRAW',
-                    "estimated_repair_cost": analysis['repair_cost'],
-                    "confidence": analysis['confidence'],
-                    "analysis_date": datetime.now().isoformat()
-                })
+            st.session_state.analysis_upload_id = uploaded_file.file_id
+            if st.session_state.tracer is not None:
+                st.session_state.tracer.annotate(dpp_uuid=analysis['dpp_uuid'], category=analysis['category'],
+                                                 recommendation=analysis['action'], near_duplicate=duplicate is not None)
+            if duplicate is not None:
+                get_metrics_store().record([('near_duplicate', DUPLICATE_POLICY, 1)])
+            reused = duplicate is not None and DUPLICATE_POLICY == 'reuse'
+            if not reused:
+                get_passport_store().record(build_passport(analysis), analysis['category'], analysis['action'])
+            get_metrics_store().record_analysis(analysis, reused=reused)
+            save_session_state()
+        
+    # Wynik zostaje na ekranie także po kolejnych kliknięciach (np. wybór serwisu) i po odtworzeniu
+    # sesji na innym workerze, gdzie uploader jest pusty
+    analysis = st.session_state.analysis_result
+    if analysis is not None:
+        if uploaded_file is None:
+            st.caption("Wynik poprzedniej analizy - prześlij nowe zdjęcie, aby przeanalizować inny przedmiot.")
+        passport = build_passport(analysis)
+        
+        # Karta Produktu
+        category_name = get_category_name(analysis['category'])
+        
+        st.markdown(render_product_card(
+            analysis['category'], analysis['product_name'], analysis['action_text'], analysis['brand'],
+            analysis['dpp_uuid'], analysis['damage_type'], analysis['damage_level']
+        ), unsafe_allow_html=True)
 
-            # PDF download
-            pdf_data = generate_passport_pdf(analysis)
-            st.download_button(
-                label="Pobierz PDF Paszportu",
-                data=pdf_data,
-                file_name=f"paszport_{analysis['dpp_uuid']}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-
-            # Akcje
-            st.markdown("---")
-            st.subheader("Co chcesz zrobic?")
-            
-            # Filtruj dane po kategorii
-            available_shops = filter_shops_by_category(analysis['category'])
-            available_buyers = filter_buyers_by_category(analysis['category'])
-            available_recyclers = filter_recyclers_by_category(analysis['category'])
-            
-            # Tabs
-            tab_repair, tab_sell, tab_recycle = st.tabs(["Napraw Lokalnie", "Sprzedaj", "Zutylizuj"])
-            
-            # ============================================
-            # TAB 1: NAPRAWA
-            # ============================================
+        # Metryki finansowe
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.metric("Koszt naprawy", f"{analysis['repair_cost']} PLN")
+        with c2:
+            st.metric("Wartosc rynkowa", f"{analysis['market_value']} PLN")
+        with c3:
+            st.metric("Pewnosc AI", f"{int(analysis['confidence']*100)}%")
+
+        # Paszport Cyfrowy
+        with st.expander("Paszport Cyfrowy Produktu (DPP)"):
+            st.info("Dane pobrane z centralnej bazy producenta i systemu GOZ.AI")
+            st.json(passport)
+
+        # PDF download
+        with trace_span('passport_pdf'):
+            passport_pdf_path = get_passport_pdfs().ensure(analysis)
+        st.download_button(
+            label="Pobierz PDF Paszportu",
+            data=file_download_data(passport_pdf_path),
+            file_name=f"paszport_{analysis['dpp_uuid']}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+
+        # Akcje
+        st.markdown("---")
+        st.subheader("Co chcesz zrobic?")
+        
+        # Najlepsi partnerzy w kategorii (ranking wielokryterialny)
+        with trace_span('ranking'):
+            available_shops, shops_total = rank_partners('shops', analysis['category'])
+            available_buyers, buyers_total = rank_partners('buyers', analysis['category'])
+            available_recyclers, recyclers_total = rank_partners('recyclers', analysis['category'])
+        if analyze_btn:
+            get_metrics_store().record_impressions('shops', [shop['name'] for shop in available_shops])
+            get_metrics_store().record_impressions('buyers', [buyer['name'] for buyer in available_buyers])
+            get_metrics_store().record_impressions('recyclers', [recycler['name'] for recycler in available_recyclers])
+        
+        # Tabs
+        tab_repair, tab_sell, tab_recycle = st.tabs(["Napraw Lokalnie", "Sprzedaj", "Zutylizuj"])
+        
+        # ============================================
+        # TAB 1: NAPRAWA
+        # ============================================
+        
+        with tab_repair:
+            st.write(f"### Rekomendowane serwisy ({shops_total} dostepne):")
             
-            with tab_repair:
-                st.write(f"### Rekomendowane serwisy ({len(available_shops)} dostepne):")
+            if available_shops:
+                # Mapa serwisów
+                map_data = pd.DataFrame({
+                    'latitude': [shop['lat'] for shop in available_shops],
+                    'longitude': [shop['lon'] for shop in available_shops]
+                })
+                st.map(map_data, zoom=12)
                 
-                if available_shops:
-                    # Mapa serwisów
-                    map_data = pd.DataFrame({
-                        'latitude': [shop['lat'] for shop in available_shops],
-                        'longitude': [shop['lon'] for shop in available_shops]
-                    })
-                    st.map(map_data, zoom=12)
+                # Lista serwisów
+                st.write("\n**Dostepne serwisy:**\n")
+                for shop in available_shops:
+                    st.markdown(render_shop_card(
+                        shop['name'], shop['address'], shop['rating'], shop['response_time'],
+                        shop['avg_price'], tuple(shop.get('specialization', []))
+                    ), unsafe_allow_html=True)
                     
-                    # Lista serwisów
-                    st.write("\n**Dostepne serwisy:**\n")
-                    for shop in available_shops:
-                        spec_badges = " ".join([f"<span class='category-badge {get_category_color(cat)}'>{get_category_name(cat)}</span>" for cat in shop.get('specialization', [])])
-                        
-                        st.markdown(f"""
-                        <div class="shop-card">
-                            <div style="display:flex; justify-content:space-between;">
-                                <div>
-                                    <b>{shop['name']}</b><br>
-                                    <small>Adres: {shop['address']}</small><br>
-                                    <small>Rating: {shop['rating']}/5.0 | Czas odpowiedzi: {shop['response_time']}</small><br>
-                                    <div style="margin-top:8px;">
-                                        {spec_badges}
-                                    </div>
-                                </div>
-                                <div style="text-align:right; font-weight:bold; color:#10b981;">
-                                    {shop['avg_price']} PLN
-                                </div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        if st.button(f"Zaakceptuj {shop['name']}", key=f"repair_{shop['id']}", use_container_width=True):
-                            st.session_state.selected_shop = shop
-                            st.session_state.current_page = 'repair_delivery'
-                            st.rerun()
-                else:
-                    st.warning(f"Brak dostepnych serwisów dla kategorii: {category_name}")
-            
-            # ============================================
-            # TAB 2: SPRZEDAŻ
-            # ============================================
-            
-            with tab_sell:
-                st.write(f"### Oferty odkupu produktu ({len(available_buyers)} dostepne):")
-                
-                if available_buyers:
-                    for buyer in available_buyers:
-                        offer_price = int(analysis['estimated_value'] * buyer['offer_percent'])
-                        
-                        st.markdown(f"""
-                        <div class="buyer-card">
-                            <div style="display:flex; justify-content:space-between; align-items:center;">
-                                <div>
-                                    <b>{buyer['name']}</b><br>
-                                    <small>Rating: {buyer['rating']}/5.0</small><br>
-                                    <small>Dostarczenie: {buyer['delivery_time']}</small>
-                                </div>
-                                <div style="text-align:right; font-weight:bold; color:#10b981; font-size:1.3em;">
-                                    {offer_price} PLN
-                                </div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        if st.button(f"Zaakceptuj {buyer['name']}", key=f"buyer_{buyer['name']}", use_container_width=True):
-                            st.session_state.selected_buyer = buyer
-                            st.session_state.current_page = 'sell_delivery'
-                            st.rerun()
-                else:
-                    st.warning(f"Brak dostepnych kupujacych dla kategorii: {category_name}")
+                    if tracked_button(f"Zaakceptuj {shop['name']}", key=f"repair_{shop['id']}", use_container_width=True):
+                        st.session_state.selected_shop = shop
+                        st.session_state.current_page = 'repair_delivery'
+                        rerun()
+            else:
+                st.warning(f"Brak dostepnych serwisów dla kategorii: {category_name}")
+        
+        # ============================================
+        # TAB 2: SPRZEDAŻ
+        # ============================================
+        
+        with tab_sell:
+            st.write(f"### Oferty odkupu produktu ({buyers_total} dostepne):")
             
-            # ============================================
-            # TAB 3: RECYKLING
-            # ============================================
+            if available_buyers:
+                for buyer in available_buyers:
+                    offer_price = int(analysis['estimated_value'] * buyer['offer_percent'])
+                    
+                    st.markdown(render_buyer_card(
+                        buyer['name'], buyer['rating'], buyer['delivery_time'], offer_price
+                    ), unsafe_allow_html=True)
+                    
+                    if tracked_button(f"Zaakceptuj {buyer['name']}", key=f"buyer_{buyer['name']}", use_container_width=True):
+                        st.session_state.selected_buyer = buyer
+                        st.session_state.current_page = 'sell_delivery'
+                        rerun()
+            else:
+                st.warning(f"Brak dostepnych kupujacych dla kategorii: {category_name}")
+        
+        # ============================================
+        # TAB 3: RECYKLING
+        # ============================================
+        
+        with tab_recycle:
+            st.write(f"### Certyfikowane punkty recyklingu ({recyclers_total} dostepne):")
             
-            with tab_recycle:
-                st.write(f"### Certyfikowane punkty recyklingu ({len(available_recyclers)} dostepne):")
-                
-                if available_recyclers:
-                    for recycler in available_recyclers:
-                        st.markdown(f"""
-                        <div class="recycler-card">
-                            <b>{recycler['name']}</b><br>
-                            <small>Adres: {recycler['address']}</small><br>
-                            <small>Rating: {recycler['rating']}/5.0 | Certyfikowany: {recycler.get('certification', 'WEEE')}</small><br>
-                            <small>Przyjmuje: {recycler['materials']}</small><br>
-                            <small style="color:#059669; font-weight:bold;">Cena: {recycler['price']}</small>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        if st.button(f"Zaakceptuj {recycler['name']}", key=f"recycler_{recycler['id']}", use_container_width=True):
-                            st.session_state.selected_recycler = recycler
-                            st.session_state.current_page = 'recycle_delivery'
-                            st.rerun()
-                else:
-                    st.warning(f"Brak dostepnych recyklerow dla kategorii: {category_name}")
+            if available_recyclers:
+                for recycler in available_recyclers:
+                    st.markdown(render_recycler_card(
+                        recycler['name'], recycler['address'], recycler['rating'],
+                        recycler.get('certification', 'WEEE'), recycler['materials'], recycler['price']
+                    ), unsafe_allow_html=True)
+                    
+                    if tracked_button(f"Zaakceptuj {recycler['name']}", key=f"recycler_{recycler['id']}", use_container_width=True):
+                        st.session_state.selected_recycler = recycler
+                        st.session_state.current_page = 'recycle_delivery'
+                        rerun()
+            else:
+                st.warning(f"Brak dostepnych recyklerow dla kategorii: {category_name}")
 
     # Footer
     st.markdown("---")
@@ -598,7 +847,7 @@ elif st.session_state.current_page == 'repair_delivery':
     st.markdown(f"""
     <div class="status-card">
         <h3 style="margin-top:0;">{category_emoji} {analysis['product_name']}</h3>
-        <p><b>Serwis:</b> {shop['name']}</p>
+        <p><b>Serwis:</b> {html.escape(str(shop['name']))}</p>
         <p><b>Koszt naprawy:</b> {analysis['repair_cost']} PLN</p>
     </div>
     """, unsafe_allow_html=True)
@@ -619,9 +868,11 @@ elif st.session_state.current_page == 'repair_delivery':
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("Zamów kurier InPost", use_container_width=True, key="repair_inpost"):
+        if tracked_button("Zamów kurier InPost", use_container_width=True, key="repair_inpost"):
+            get_metrics_store().record_order('shops', shop['name'], 'repair_confirmation_inpost')
+            order_shipment('inpost_locker', shop['name'], shop['address'])
             st.session_state.current_page = 'repair_confirmation_inpost'
-            st.rerun()
+            rerun()
     
     with col2:
         st.markdown("""
@@ -635,9 +886,10 @@ elif st.session_state.current_page == 'repair_delivery':
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("Umów osobisty odbiór", use_container_width=True, key="repair_personal"):
+        if tracked_button("Umów osobisty odbiór", use_container_width=True, key="repair_personal"):
+            get_metrics_store().record_order('shops', shop['name'], 'repair_confirmation_personal')
             st.session_state.current_page = 'repair_confirmation_personal'
-            st.rerun()
+            rerun()
 
 # ============================================
 # POTWIERDZENIE NAPRAWY - INPOST
@@ -663,8 +915,8 @@ elif st.session_state.current_page == 'repair_confirmation_inpost':
     <div class="status-card">
         <h3>Szczegóły zamówienia</h3>
         <p><b>Produkt:</b> {category_emoji} {analysis['product_name']}</p>
-        <p><b>Serwis:</b> {shop['name']}</p>
-        <p><b>Adres serwisu:</b> {shop['address']}</p>
+        <p><b>Serwis:</b> {html.escape(str(shop['name']))}</p>
+        <p><b>Adres serwisu:</b> {html.escape(str(shop['address']))}</p>
         <hr>
         <p><b>Koszt naprawy:</b> {analysis['repair_cost']} PLN</p>
         <p><b>Przesyłka InPost:</b> {inpost_cost} PLN</p>
@@ -672,26 +924,31 @@ elif st.session_state.current_page == 'repair_confirmation_inpost':
             <b>RAZEM: {total_cost} PLN</b>
         </p>
         <hr>
-        <p><b>Numer śledzenia:</b> PL-{random.randint(1000000000, 9999999999)}</p>
+        <p><b>Numer śledzenia:</b> {get_tracking_number()}</p>
         <p><b>Przesyłka do serwisu:</b> Od razu</p>
-        <p><b>Naprawa:</b> ok. {shop['response_time']}</p>
+        <p><b>Naprawa:</b> ok. {html.escape(str(shop['response_time']))}</p>
         <p><b>Przesyłka powrotna:</b> Do 5 dni roboczych</p>
     </div>
     """, unsafe_allow_html=True)
     
+    send_confirmation(
+        f"GOZ.AI - naprawa {analysis['product_name']}",
+        f"Zamówienie naprawy w serwisie {shop['name']} ({shop['address']}) zostało potwierdzone.\n"
+        f"Identyfikator paszportu DPP: {analysis['dpp_uuid']}\n"
+        f"Razem do zapłaty: {total_cost} PLN",
+        sms_text=f"GOZ.AI: naprawa {analysis['product_name']} potwierdzona. Serwis: {shop['name']}."
+    )
     st.info("📧 Potwierdzenie zostało wysłane na Twój email. Dowiesz się o statusie naprawy SMS-em lub mailem.")
     
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("Pobierz etykietę do wydruku", use_container_width=True):
-            st.success("📄 Etykieta gotowa do pobrania!")
+        if render_shipment_label():
             st.info("Instrukcja: Wydrukuj etykietę i dołącz ją do paczki w paczkomacie InPost")
     
     with col2:
-        if st.button("Powrót do głównego menu", use_container_width=True):
-            st.session_state.current_page = 'main'
-            st.session_state.analysis_result = None
-            st.rerun()
+        if tracked_button("Powrót do głównego menu", use_container_width=True):
+            reset_to_main()
+            rerun()
 
 # ============================================
 # POTWIERDZENIE NAPRAWY - OSOBISTY ODBIÓR
@@ -715,28 +972,27 @@ elif st.session_state.current_page == 'repair_confirmation_personal':
     <div class="status-card">
         <h3>Szczegóły umówienia</h3>
         <p><b>Produkt:</b> {category_emoji} {analysis['product_name']}</p>
-        <p><b>Serwis:</b> {shop['name']}</p>
-        <p><b>Adres:</b> {shop['address']}</p>
-        <p><b>Telefon:</b> +48 22 {random.randint(100, 999)} {random.randint(10, 99)} {random.randint(10, 99)}</p>
+        <p><b>Serwis:</b> {html.escape(str(shop['name']))}</p>
+        <p><b>Adres:</b> {html.escape(str(shop['address']))}</p>
+        <p><b>Telefon:</b> +48 22 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}</p>
         <hr>
         <p><b>Koszt naprawy:</b> {analysis['repair_cost']} PLN</p>
         <p style="font-size:1.3em; font-weight:bold; color:#10b981;">
             <b>RAZEM: {analysis['repair_cost']} PLN (brak opcji dostawy)</b>
         </p>
         <hr>
-        <p><b>ID zamówienia:</b> REP-{random.randint(100000, 999999)}</p>
+        <p><b>ID zamówienia:</b> REP-{rng.randint(100000, 999999)}</p>
         <p><b>Odbór:</b> 2-3 dni robocze (Pon-Pt 10:00-18:00)</p>
-        <p><b>Naprawa:</b> ok. {shop['response_time']}</p>
+        <p><b>Naprawa:</b> ok. {html.escape(str(shop['response_time']))}</p>
     </div>
     """, unsafe_allow_html=True)
     
     st.warning("⏰ Pamiętaj aby odebrać produkt w ciągu 14 dni od naprawy!")
     st.info("Serwis czeka na Twój telefon w celu ustalenia dokładnego terminu odbioru.")
     
-    if st.button("Powrót do głównego menu", use_container_width=True):
-        st.session_state.current_page = 'main'
-        st.session_state.analysis_result = None
-        st.rerun()
+    if tracked_button("Powrót do głównego menu", use_container_width=True):
+        reset_to_main()
+        rerun()
 
 # ============================================
 # STRONA: OPCJE DOSTAWY DO SPRZEDAŻY
@@ -753,7 +1009,7 @@ elif st.session_state.current_page == 'sell_delivery':
     st.markdown(f"""
     <div class="status-card">
         <h3 style="margin-top:0;">{category_emoji} {analysis['product_name']}</h3>
-        <p><b>Kupujący:</b> {buyer['name']}</p>
+        <p><b>Kupujący:</b> {html.escape(str(buyer['name']))}</p>
         <p><b>Oferta:</b> {offer_price} PLN</p>
     </div>
     """, unsafe_allow_html=True)
@@ -775,9 +1031,11 @@ elif st.session_state.current_page == 'sell_delivery':
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("Wyslij przez InPost", use_container_width=True, key="sell_inpost"):
+        if tracked_button("Wyslij przez InPost", use_container_width=True, key="sell_inpost"):
+            get_metrics_store().record_order('buyers', buyer['name'], 'sell_confirmation_inpost')
+            order_shipment('inpost_locker', buyer['name'], buyer.get('address', buyer['name']))
             st.session_state.current_page = 'sell_confirmation_inpost'
-            st.rerun()
+            rerun()
     
     with col2:
         st.markdown("""
@@ -792,9 +1050,10 @@ elif st.session_state.current_page == 'sell_delivery':
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("Umów spotkanie", use_container_width=True, key="sell_personal"):
+        if tracked_button("Umów spotkanie", use_container_width=True, key="sell_personal"):
+            get_metrics_store().record_order('buyers', buyer['name'], 'sell_confirmation_personal')
             st.session_state.current_page = 'sell_confirmation_personal'
-            st.rerun()
+            rerun()
 
 # ============================================
 # POTWIERDZENIE SPRZEDAŻY - INPOST
@@ -821,8 +1080,8 @@ elif st.session_state.current_page == 'sell_confirmation_inpost':
     <div class="status-card">
         <h3>Szczegóły transakcji</h3>
         <p><b>Produkt:</b> {category_emoji} {analysis['product_name']}</p>
-        <p><b>Kupujący:</b> {buyer['name']}</p>
-        <p><b>Kontakt:</b> {buyer['name']} Support</p>
+        <p><b>Kupujący:</b> {html.escape(str(buyer['name']))}</p>
+        <p><b>Kontakt:</b> {html.escape(str(buyer['name']))} Support</p>
         <hr>
         <p><b>Cena sprzedaży:</b> {offer_price} PLN</p>
         <p><b>Koszt InPost:</b> {inpost_cost} PLN</p>
@@ -830,25 +1089,29 @@ elif st.session_state.current_page == 'sell_confirmation_inpost':
             <b>DO WYPŁATY: {net_payment} PLN</b>
         </p>
         <hr>
-        <p><b>Numer śledzenia:</b> PL-{random.randint(1000000000, 9999999999)}</p>
+        <p><b>Numer śledzenia:</b> {get_tracking_number()}</p>
         <p><b>Status Escrow:</b> AKTYWNY</p>
         <p><b>Płatność:</b> Po weryfikacji przez kupującego (3-5 dni)</p>
     </div>
     """, unsafe_allow_html=True)
     
     st.success("💳 Kwota czeka w bezpiecznym Escrow. Trafia na Twoje konto gdy kupujący potwierdzi otrzymanie.")
+    send_confirmation(
+        f"GOZ.AI - sprzedaż {analysis['product_name']}",
+        f"Transakcja z {buyer['name']} potwierdzona (Escrow aktywny).\n"
+        f"Do wypłaty: {net_payment} PLN\n"
+        "Pobierz etykietę InPost w aplikacji GOZ.AI i nadaj paczkę w paczkomacie."
+    )
     st.info("📧 Instrukcje wysłane na email. Pobierz etykietę InPost i wyślij pakiet.")
     
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("Pobierz etykietę do wydruku", use_container_width=True):
-            st.success("📄 Etykieta gotowa!")
+        render_shipment_label()
     
     with col2:
-        if st.button("Powrót do głównego menu", use_container_width=True):
-            st.session_state.current_page = 'main'
-            st.session_state.analysis_result = None
-            st.rerun()
+        if tracked_button("Powrót do głównego menu", use_container_width=True):
+            reset_to_main()
+            rerun()
 
 # ============================================
 # POTWIERDZENIE SPRZEDAŻY - OSOBISTE SPOTKANIE
@@ -873,16 +1136,16 @@ elif st.session_state.current_page == 'sell_confirmation_personal':
     <div class="status-card">
         <h3>Szczegóły spotkania</h3>
         <p><b>Produkt:</b> {category_emoji} {analysis['product_name']}</p>
-        <p><b>Kupujący:</b> {buyer['name']}</p>
-        <p><b>Kontakt:</b> +48 22 {random.randint(100, 999)} {random.randint(10, 99)} {random.randint(10, 99)}</p>
-        <p><b>Email:</b> contact@{buyer['name'].lower()}.pl</p>
+        <p><b>Kupujący:</b> {html.escape(str(buyer['name']))}</p>
+        <p><b>Kontakt:</b> +48 22 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}</p>
+        <p><b>Email:</b> contact@{html.escape(str(buyer['name'].lower()))}.pl</p>
         <hr>
         <p><b>Cena:</b> {offer_price} PLN</p>
         <p style="font-size:1.3em; font-weight:bold; color:#10b981;">
             <b>DO WYPŁATY: {offer_price} PLN (na miejscu)</b>
         </p>
         <hr>
-        <p><b>ID transakcji:</b> SELL-{random.randint(100000, 999999)}</p>
+        <p><b>ID transakcji:</b> SELL-{rng.randint(100000, 999999)}</p>
         <p><b>Termin spotkania:</b> Do uzgodnienia</p>
         <p><b>Forma płatności:</b> Gotówka / Przelew</p>
     </div>
@@ -891,10 +1154,9 @@ elif st.session_state.current_page == 'sell_confirmation_personal':
     st.info("☎️ Skontaktuj się z kupującym celem ustalenia miejsca i czasu spotkania.")
     st.warning("⚠️ Sprawdź dane konta przed przekazaniem produktu!")
     
-    if st.button("Powrót do głównego menu", use_container_width=True):
-        st.session_state.current_page = 'main'
-        st.session_state.analysis_result = None
-        st.rerun()
+    if tracked_button("Powrót do głównego menu", use_container_width=True):
+        reset_to_main()
+        rerun()
 
 # ============================================
 # STRONA: OPCJE DOSTAWY DO RECYKLINGU
@@ -910,8 +1172,8 @@ elif st.session_state.current_page == 'recycle_delivery':
     st.markdown(f"""
     <div class="status-card">
         <h3 style="margin-top:0;">{category_emoji} {analysis['product_name']}</h3>
-        <p><b>Punkt recyklingu:</b> {recycler['name']}</p>
-        <p><b>Certyfikacja:</b> {recycler.get('certification', 'WEEE')}</p>
+        <p><b>Punkt recyklingu:</b> {html.escape(str(recycler['name']))}</p>
+        <p><b>Certyfikacja:</b> {html.escape(str(recycler.get('certification', 'WEEE')))}</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -932,9 +1194,11 @@ elif st.session_state.current_page == 'recycle_delivery':
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("Zamów kurier", use_container_width=True, key="recycle_courier"):
+        if tracked_button("Zamów kurier", use_container_width=True, key="recycle_courier"):
+            get_metrics_store().record_order('recyclers', recycler['name'], 'recycle_confirmation_courier')
+            order_shipment('courier_pickup', recycler['name'], recycler['address'])
             st.session_state.current_page = 'recycle_confirmation_courier'
-            st.rerun()
+            rerun()
     
     with col2:
         st.markdown("""
@@ -949,9 +1213,10 @@ elif st.session_state.current_page == 'recycle_delivery':
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("Dostarcze sam", use_container_width=True, key="recycle_personal"):
+        if tracked_button("Dostarcze sam", use_container_width=True, key="recycle_personal"):
+            get_metrics_store().record_order('recyclers', recycler['name'], 'recycle_confirmation_personal')
             st.session_state.current_page = 'recycle_confirmation_personal'
-            st.rerun()
+            rerun()
 
 # ============================================
 # POTWIERDZENIE RECYKLINGU - KURIER
@@ -975,27 +1240,33 @@ elif st.session_state.current_page == 'recycle_confirmation_courier':
     <div class="status-card">
         <h3>Szczegóły odbioru</h3>
         <p><b>Produkt:</b> {category_emoji} {analysis['product_name']}</p>
-        <p><b>Punkt docelowy:</b> {recycler['name']}</p>
-        <p><b>Adres:</b> {recycler['address']}</p>
-        <p><b>Certyfikacja:</b> {recycler.get('certification', 'WEEE')}</p>
+        <p><b>Punkt docelowy:</b> {html.escape(str(recycler['name']))}</p>
+        <p><b>Adres:</b> {html.escape(str(recycler['address']))}</p>
+        <p><b>Certyfikacja:</b> {html.escape(str(recycler.get('certification', 'WEEE')))}</p>
         <hr>
         <p><b>Koszt:</b> 0 PLN (darmowy)</p>
         <p><b>Bonus GOZ.AI:</b> +5 pkt</p>
         <hr>
-        <p><b>ID zlecenia:</b> REC-{random.randint(100000, 999999)}</p>
-        <p><b>Numer kuriera:</b> PL-{random.randint(1000000000, 9999999999)}</p>
+        <p><b>ID zlecenia:</b> REC-{rng.randint(100000, 999999)}</p>
+        <p><b>Numer kuriera:</b> {get_tracking_number()}</p>
         <p><b>Odbór:</b> Jutro 08:00 - 22:00</p>
         <p><b>Zaświadczenie:</b> Otrzymasz mailem</p>
     </div>
     """, unsafe_allow_html=True)
     
     st.success("♻️ Dzięki za wspieranie gospodarki cyrkularnej!")
+    send_confirmation(
+        f"GOZ.AI - odbiór do recyklingu {analysis['product_name']}",
+        f"Kurier odbierze produkt jutro w godzinach 08:00 - 22:00.\n"
+        f"Punkt docelowy: {recycler['name']} ({recycler['address']})\n"
+        "Bonus GOZ.AI: +5 pkt",
+        sms_text="GOZ.AI: kurier odbierze produkt do recyklingu jutro 08:00-22:00."
+    )
     st.info("📧 Potwierdzenie wysłane na email. Będziesz mógł śledzić przesyłkę w systemie GOZ.AI.")
     
-    if st.button("Powrót do głównego menu", use_container_width=True):
-        st.session_state.current_page = 'main'
-        st.session_state.analysis_result = None
-        st.rerun()
+    if tracked_button("Powrót do głównego menu", use_container_width=True):
+        reset_to_main()
+        rerun()
 
 # ============================================
 # POTWIERDZENIE RECYKLINGU - OSOBISTE
@@ -1019,8 +1290,8 @@ elif st.session_state.current_page == 'recycle_confirmation_personal':
     <div class="status-card">
         <h3>Szczegóły punktu recyklingu</h3>
         <p><b>Produkt:</b> {category_emoji} {analysis['product_name']}</p>
-        <p><b>Punkt:</b> {recycler['name']}</p>
-        <p><b>Adres:</b> {recycler['address']}</p>
+        <p><b>Punkt:</b> {html.escape(str(recycler['name']))}</p>
+        <p><b>Adres:</b> {html.escape(str(recycler['address']))}</p>
         <p><b>Rating:</b> {recycler['rating']}/5.0</p>
         <hr>
         <p><b>Godziny otwarcia:</b></p>
@@ -1028,11 +1299,11 @@ elif st.session_state.current_page == 'recycle_confirmation_personal':
         <p>Sob: 10:00 - 16:00</p>
         <p>Niedz: ZAMKNIĘTE</p>
         <hr>
-        <p><b>Telefon:</b> +48 22 {random.randint(100, 999)} {random.randint(10, 99)} {random.randint(10, 99)}</p>
+        <p><b>Telefon:</b> +48 22 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}</p>
         <p><b>Koszt:</b> 0 PLN (darmowy)</p>
         <p><b>Bonus GOZ.AI:</b> +10 pkt</p>
         <hr>
-        <p><b>ID zlecenia:</b> REC-{random.randint(100000, 999999)}</p>
+        <p><b>ID zlecenia:</b> REC-{rng.randint(100000, 999999)}</p>
         <p><b>Zaświadczenie:</b> Otrzymasz w punkcie</p>
     </div>
     """, unsafe_allow_html=True)
@@ -1040,7 +1311,120 @@ elif st.session_state.current_page == 'recycle_confirmation_personal':
     st.success("♻️ Dziękujemy! Twój produkt będzie odpowiednio przetworzony!")
     st.info("💚 Każdy powrót produktu do recyklingu pomaga planecie!")
     
-    if st.button("Powrót do głównego menu", use_container_width=True):
-        st.session_state.current_page = 'main'
-        st.session_state.analysis_result = None
-        st.rerun()
\ No newline at end of file
+    if tracked_button("Powrót do głównego menu", use_container_width=True):
+        reset_to_main()
+        rerun()
+
+# ============================================
+# PANEL OPERACYJNY (ADMIN)
+# ============================================
+
+elif st.session_state.current_page == 'admin_dashboard':
+    st.title("Panel operacyjny GOZ.AI")
+    
+    metrics = get_metrics_store()
+    hours = st.select_slider("Okno czasowe (godziny)", options=[1, 6, 12, 24, 72, 168], value=24)
+    
+    action_mix = metrics.action_mix(hours)
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        st.metric("Analizy", sum(action_mix.values()))
+    with c2:
+        st.metric("Zamówienia", sum(orders for _, orders, _ in metrics.partner_conversion(hours).values()))
+    with c3:
+        st.metric("Punkty recyklingu", f"{metrics.points_awarded(hours):.0f} pkt")
+    with c4:
+        st.metric("Analizy (od startu)", sum(count for count, _ in metrics.totals('analyses').values()))
+    
+    per_hour = metrics.analyses_per_hour(hours)
+    duplicates = sum(count for count, _ in metrics.totals('near_duplicate').values())
+    st.caption(f"Analizy obejmują ponowne skany z wynikiem z indeksu zdjęć: {sum(reused for _, _, reused in per_hour)} "
+               f"w oknie (nie wliczane do średniej wyceny) | rozpoznane ponowne skany (od startu): {duplicates} | "
+               f"zdjęć w indeksie: {get_image_index().count()}")
+    
+    st.subheader("Analizy na godzinę")
+    st.bar_chart(pd.DataFrame({
+        'godzina': [datetime.fromtimestamp(ts).strftime('%m-%d %H:00') for ts, _, _ in per_hour],
+        'nowe analizy': [new for _, new, _ in per_hour],
+        'ponowne skany': [reused for _, _, reused in per_hour]
+    }).set_index('godzina'))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Rekomendacje")
+        st.dataframe(pd.DataFrame({
+            'akcja': ["SPRZEDAJ", "NAPRAW", "ZUTYLIZUJ"],
+            'liczba': [action_mix.get(action, 0) for action in ["SPRZEDAJ", "NAPRAW", "ZUTYLIZUJ"]]
+        }), hide_index=True, use_container_width=True)
+    with col2:
+        st.subheader("Średnia wartość")
+        avg_values = metrics.avg_value_by_category(hours)
+        st.dataframe(pd.DataFrame({
+            'kategoria': [get_category_name(category) for category in avg_values],
+            'średnia wartość (PLN)': [round(value) for value in avg_values.values()]
+        }), hide_index=True, use_container_width=True)
+    
+    st.subheader("Konwersja partnerów")
+    conversion = metrics.partner_conversion(hours)
+    if conversion:
+        st.dataframe(pd.DataFrame([
+            {'typ': kind, 'partner': name, 'wyświetlenia': views, 'zamówienia': orders, 'konwersja': f"{rate:.0%}"}
+            for (kind, name), (views, orders, rate) in sorted(conversion.items(), key=lambda item: -item[1][1])
+        ]), hide_index=True, use_container_width=True)
+    else:
+        st.info("Brak danych o partnerach w wybranym oknie.")
+    
+    if MEASURE_PAYLOAD:
+        st.subheader("Payload do przeglądarki (na przebieg skryptu)")
+        st.dataframe(pd.DataFrame(get_payload_meter().summary()), hide_index=True, use_container_width=True)
+    
+    if MEMORY_DIAGNOSTICS:
+        st.subheader("Pamięć procesu")
+        diagnostics = get_memory_diagnostics()
+        sessions = count_sessions()
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.metric("RSS", f"{read_rss() / 2 ** 20:.0f} MB")
+        with c2:
+            st.metric("Śledzone (tracemalloc)", f"{tracemalloc.get_traced_memory()[0] / 2 ** 20:.1f} MB")
+        with c3:
+            st.metric("Aktywne sesje", sessions if sessions is not None else "-")
+        
+        if diagnostics.samples:
+            st.line_chart(pd.DataFrame([
+                {
+                    'czas': datetime.fromtimestamp(sample['time']).strftime('%H:%M'),
+                    'RSS (MB)': round(sample['rss'] / 2 ** 20, 1),
+                    'sesje': sample['sessions'] or 0
+                }
+                for sample in diagnostics.samples
+            ]).set_index('czas'))
+        
+        st.write("**Przyrost pamięci w trakcie przebiegu (per strona)**")
+        st.caption("Wartości przybliżone - tracemalloc mierzy cały proces, więc wliczają się też przebiegi innych sesji wykonywane w tym samym czasie.")
+        st.dataframe(pd.DataFrame(diagnostics.page_summary()), hide_index=True, use_container_width=True)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            show_growth = tracked_button("Największe przyrosty", use_container_width=True)
+        with col2:
+            if tracked_button("Nowy snapshot bazowy", use_container_width=True):
+                diagnostics.reset_baseline()
+        with col3:
+            if tracked_button("Zrzuć do logu", use_container_width=True):
+                diagnostics.log_report()
+                st.toast("Raport pamięci zapisany w logu goz.memory")
+        if show_growth:
+            st.caption(f"Względem snapshotu z {datetime.fromtimestamp(diagnostics.baseline_at).strftime('%Y-%m-%d %H:%M')}")
+            st.dataframe(pd.DataFrame(diagnostics.top_growth()), hide_index=True, use_container_width=True)
+    
+    if tracked_button("Odśwież", use_container_width=True):
+        rerun()
+
+# ============================================
+# KONIEC PRZEBIEGU
+# ============================================
+
+# Przebiegi przerwane przez rerun() zamyka początek kolejnego przebiegu
+end_trace_run()
+end_memory_run()
@@ -0,0 +1,108 @@
+"""Magazyn zdjęć adresowany treścią (SHA-256) z deduplikacją.
+
+Układ na dysku:
+    <root>/ab/cd/abcd...ef            - oryginał
+    <root>/ab/cd/abcd...ef.thumb.jpg  - miniatura z preprocessingu
+"""
+
+import hashlib
+import os
+import tempfile
+
+BLOB_ROOT = os.environ.get('GOZ_BLOB_ROOT', 'blobs')
+CHUNK_SIZE = 1024 * 1024
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+
+
+class BlobStore:
+    """Przechowuje każde unikalne zdjęcie dokładnie raz"""
+
+    def __init__(self, root=BLOB_ROOT, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest, suffix=''):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + suffix)
+
+    def exists(self, digest, suffix=''):
+        return os.path.exists(self.path(digest, suffix))
+
+    def open(self, digest, suffix=''):
+        return open(self.path(digest, suffix), 'rb')
+
+    def _commit(self, tmp_path, digest, suffix=''):
+        """Przenieś plik tymczasowy na miejsce docelowe; duplikat jest usuwany"""
+        target = self.path(digest, suffix)
+        if os.path.exists(target):
+            os.unlink(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+        return True
+
+    def _tempfile(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def put(self, source):
+        """Zapisz plik/bufor; zwraca (digest, czy_nowy)
+
+        Bufory w pamięci (BytesIO, UploadedFile) są haszowane przez memoryview
+        bez kopiowania; gdy blob już istnieje, nic nie jest zapisywane.
+        Pozostałe źródła są strumieniowane kawałkami przez jeden bufor.
+        """
+        if hasattr(source, 'getbuffer'):
+            return self._put_buffer(source)
+        return self._put_stream(source)
+
+    def _put_buffer(self, source):
+        with source.getbuffer() as view:
+            digest = hashlib.sha256(view).hexdigest()
+            if self.exists(digest):
+                return digest, False
+            out, tmp_path = self._tempfile()
+            try:
+                with out:
+                    for offset in range(0, len(view), self.chunk_size):
+                        out.write(view[offset:offset + self.chunk_size])
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return digest, self._commit(tmp_path, digest)
+
+    def _put_stream(self, source):
+        hasher = hashlib.sha256()
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        out, tmp_path = self._tempfile()
+        try:
+            with out:
+                while True:
+                    n = source.readinto(buffer)
+                    if not n:
+                        break
+                    hasher.update(view[:n])
+                    out.write(view[:n])
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        finally:
+            view.release()
+        digest = hasher.hexdigest()
+        return digest, self._commit(tmp_path, digest)
+
+    def put_thumbnail(self, digest, size=THUMBNAIL_SIZE):
+        """Wygeneruj i zapisz miniaturę obok oryginału (raz na blob)"""
+        if self.exists(digest, THUMBNAIL_SUFFIX):
+            return self.path(digest, THUMBNAIL_SUFFIX)
+        from PIL import Image
+
+        with self.open(digest) as f, Image.open(f) as image:
+            image.thumbnail(size)
+            out, tmp_path = self._tempfile()
+            with out:
+                image.convert('RGB').save(out, format='JPEG', quality=85)
+        self._commit(tmp_path, digest, THUMBNAIL_SUFFIX)
+        return self.path(digest, THUMBNAIL_SUFFIX)
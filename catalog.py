@@ -0,0 +1,96 @@
+"""Katalog produktów i partnerów (fake_data.json) oraz indeksy rankingowe.
+
+Partnerzy zaimportowani z feedów (partner_feeds.py) zastępują odpowiednią
+listę z fake_data.json. Katalog i indeksy są budowane raz na proces
+i współdzielone przez wszystkie sesje - przy starcie serwera robi to
+rozgrzewka (warmup.py).
+"""
+
+import functools
+import json
+import os
+
+from partner_feeds import CATALOG_DIR, iter_partners, read_manifest
+from ranking import PartnerRanker
+
+CATALOG_PATH = os.environ.get('GOZ_CATALOG_PATH', 'fake_data.json')
+
+
+def load_fake_data(path=CATALOG_PATH):
+    """Załaduj dane z fake_data.json"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {
+        "products": [],
+        "repair_shops": [],
+        "buyers": [],
+        "recyclers": []
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def get_catalog():
+    """Katalog wczytany raz na proces"""
+    catalog = load_fake_data()
+    for kind in read_manifest(CATALOG_DIR):
+        catalog[kind] = list(iter_partners(kind, CATALOG_DIR))
+    return catalog
+
+
+@functools.lru_cache(maxsize=1)
+def get_partner_rankers():
+    """Zbuduj indeksy rankingowe partnerów raz na proces"""
+    catalog = get_catalog()
+    return {
+        'shops': PartnerRanker(
+            catalog.get('repair_shops', []),
+            lambda shop: shop.get('specialization', []),
+            price_of=lambda shop: shop.get('avg_price'),
+            time_of=lambda shop: shop.get('response_time')
+        ),
+        'buyers': PartnerRanker(
+            catalog.get('buyers', []),
+            lambda buyer: [buyer.get('category')],
+            price_of=lambda buyer: buyer.get('offer_percent'),
+            time_of=lambda buyer: buyer.get('delivery_time'),
+            price_higher_is_better=True
+        ),
+        'recyclers': PartnerRanker(
+            catalog.get('recyclers', []),
+            lambda recycler: recycler.get('accepted', []),
+            price_of=lambda recycler: recycler.get('price')
+        )
+    }
+
+
+# ============================================
+# KATEGORIE
+# ============================================
+
+def get_category_emoji(category):
+    """Zwróć emoji dla kategorii"""
+    emojis = {
+        "electronics": "💻",
+        "furniture": "🪑",
+        "appliance": "🍽️"
+    }
+    return emojis.get(category, "📦")
+
+def get_category_color(category):
+    """Zwróć kolor CSS dla kategorii"""
+    colors = {
+        "electronics": "cat-electronics",
+        "furniture": "cat-furniture",
+        "appliance": "cat-appliance"
+    }
+    return colors.get(category, "")
+
+def get_category_name(category):
+    """Zwróć polską nazwę kategorii"""
+    names = {
+        "electronics": "Elektronika",
+        "furniture": "Meble",
+        "appliance": "Urzadzenia"
+    }
+    return names.get(category, "Inne")
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import os
+import random
+import ssl
+import tempfile
+import threading
+import uuid
+from collections import deque
+from urllib.parse import urlsplit
+
+# ============================================
+# KONFIGURACJA
+# ============================================
+
+COURIER_API_URL = os.environ.get('COURIER_API_URL', 'http://127.0.0.1:8765')
+COURIER_API_TOKEN = os.environ.get('COURIER_API_TOKEN', 'demo-token')
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_BASE = 0.2
+DEFAULT_BACKOFF_CAP = 5.0
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class CourierError(Exception):
+    """Błąd komunikacji z API kuriera"""
+
+    def __init__(self, message, status=None, body=None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+# ============================================
+# PULA POŁĄCZEŃ (HTTP/1.1 KEEP-ALIVE)
+# ============================================
+
+class _Connection:
+    """Pojedyncze połączenie TCP/TLS wielokrotnego użytku"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def is_usable(self):
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+class ConnectionPool:
+    """Ograniczona pula połączeń keep-alive do jednego hosta"""
+
+    def __init__(self, host, port, use_ssl=False, size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl.create_default_context() if use_ssl else None
+        self.connect_timeout = connect_timeout
+        self._idle = deque()
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+
+    async def acquire(self):
+        """Pobierz wolne połączenie z puli lub otwórz nowe"""
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if conn.is_usable():
+                    return conn
+                conn.close()
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl_context),
+                timeout=self.connect_timeout
+            )
+            return _Connection(reader, writer)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, reusable=True):
+        """Oddaj połączenie do puli (lub zamknij je)"""
+        if reusable and not self._closed and conn.is_usable():
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    async def close(self):
+        self._closed = True
+        while self._idle:
+            conn = self._idle.pop()
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+async def _read_response(reader, sink=None):
+    """Odczytaj odpowiedź HTTP/1.1 (Content-Length lub chunked)
+
+    Z `sink` (plik binarny) treść udanej odpowiedzi jest zapisywana kawałkami
+    zamiast składania jej w pamięci; zwracane body to wtedy None.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Połączenie zamknięte przez serwer")
+    parts = status_line.decode('latin-1').split(' ', 2)
+    status = int(parts[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    # Błędy (status >= 400) zawsze w pamięci - treść trafia do CourierError
+    chunks = None if sink is not None and status < 400 else []
+    write = sink.write if chunks is None else chunks.append
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            while size:
+                chunk = await reader.readexactly(min(size, STREAM_CHUNK_SIZE))
+                write(chunk)
+                size -= len(chunk)
+            await reader.readexactly(2)
+    elif 'content-length' in headers:
+        remaining = int(headers['content-length'])
+        while remaining:
+            chunk = await reader.readexactly(min(remaining, STREAM_CHUNK_SIZE))
+            write(chunk)
+            remaining -= len(chunk)
+    else:
+        while True:
+            chunk = await reader.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            write(chunk)
+        headers['connection'] = 'close'
+
+    body = None if chunks is None else b''.join(chunks)
+    return status, headers, body
+
+
+# ============================================
+# KLIENT ASYNCHRONICZNY
+# ============================================
+
+class AsyncCourierClient:
+    """Asynchroniczny klient API kuriera z pulą połączeń i ponowieniami"""
+
+    def __init__(self, base_url=COURIER_API_URL, token=COURIER_API_TOKEN,
+                 pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_cap=DEFAULT_BACKOFF_CAP,
+                 rng=None):
+        url = urlsplit(base_url)
+        use_ssl = url.scheme == 'https'
+        self.host = url.hostname
+        self.port = url.port or (443 if use_ssl else 80)
+        self.base_path = url.path.rstrip('/')
+        self.token = token
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.rng = rng or random.Random()
+        self.pool = ConnectionPool(self.host, self.port, use_ssl, pool_size, connect_timeout)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Czas oczekiwania przed ponowieniem (full jitter)"""
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after)
+        return self.rng.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def _send(self, method, path, body, headers, sink=None):
+        conn = await self.pool.acquire()
+        reusable = False
+        try:
+            head = [f"{method} {self.base_path}{path} HTTP/1.1",
+                    f"Host: {self.host}:{self.port}",
+                    "Connection: keep-alive",
+                    f"Authorization: Bearer {self.token}",
+                    f"Content-Length: {len(body)}"]
+            head.extend(f"{name}: {value}" for name, value in headers.items())
+            conn.writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            if body:
+                conn.writer.write(body)
+            await conn.writer.drain()
+            status, resp_headers, resp_body = await asyncio.wait_for(
+                _read_response(conn.reader, sink), timeout=self.read_timeout
+            )
+            reusable = resp_headers.get('connection', '').lower() != 'close'
+            return status, resp_headers, resp_body
+        finally:
+            self.pool.release(conn, reusable)
+
+    async def request(self, method, path, payload=None, idempotency_key=None, accept='application/json',
+                      sink=None):
+        """Wyślij żądanie z ponowieniami; ten sam klucz idempotencji dla każdej próby
+
+        `sink` - plik binarny na treść odpowiedzi (czyszczony przed każdą próbą).
+        """
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        headers = {'Accept': accept}
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            if sink is not None:
+                sink.seek(0)
+                sink.truncate()
+            try:
+                status, resp_headers, resp_body = await self._send(method, path, body, headers, sink)
+            except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, OSError) as e:
+                last_error = CourierError(f"{method} {path}: {e!r}")
+            else:
+                if status < 400:
+                    return status, resp_headers, resp_body
+                last_error = CourierError(f"{method} {path}: HTTP {status}", status, resp_body)
+                if status not in RETRYABLE_STATUSES:
+                    raise last_error
+                if 'retry-after' in resp_headers:
+                    try:
+                        retry_after = float(resp_headers['retry-after'])
+                    except ValueError:
+                        pass
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        raise last_error
+
+    async def create_shipment(self, shipment, idempotency_key=None):
+        """Utwórz przesyłkę; zwraca dict z id i numerem śledzenia"""
+        key = idempotency_key or str(uuid.uuid4())
+        _, _, body = await self.request('POST', '/v1/shipments', shipment, idempotency_key=key)
+        return json.loads(body)
+
+    async def fetch_label(self, shipment_id, path=None):
+        """Pobierz etykietę przesyłki jako PDF
+
+        Bez `path` zwraca bytes; z `path` strumieniuje treść do pliku
+        (podmienianego dopiero po pełnym pobraniu) i zwraca ścieżkę.
+        """
+        if path is None:
+            _, _, body = await self.request('GET', f'/v1/shipments/{shipment_id}/label',
+                                            accept='application/pdf')
+            return body
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.label-')
+        try:
+            with os.fdopen(fd, 'wb') as sink:
+                await self.request('GET', f'/v1/shipments/{shipment_id}/label',
+                                   accept='application/pdf', sink=sink)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    async def close(self):
+        await self.pool.close()
+
+
+# ============================================
+# MOST DLA STREAMLIT (PĘTLA W TLE)
+# ============================================
+
+class CourierService:
+    """Uruchamia klienta w osobnym wątku, aby nie blokować skryptu Streamlit"""
+
+    def __init__(self, **client_kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='courier-loop', daemon=True)
+        self._thread.start()
+        self.client = self._run(self._make_client(client_kwargs)).result()
+
+    async def _make_client(self, client_kwargs):
+        # Semafor puli musi powstać wewnątrz pętli zdarzeń
+        return AsyncCourierClient(**client_kwargs)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def create_shipment(self, shipment, idempotency_key=None):
+        """Zleć utworzenie przesyłki; zwraca concurrent.futures.Future"""
+        return self._run(self.client.create_shipment(shipment, idempotency_key))
+
+    def fetch_label(self, shipment_id, path=None):
+        """Zleć pobranie etykiety (do pliku, gdy podano `path`); zwraca concurrent.futures.Future"""
+        return self._run(self.client.fetch_label(shipment_id, path))
+
+    def close(self):
+        self._run(self.client.close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def build_shipment(service, receiver_name, receiver_address, reference, parcel_size='A'):
+    """Zbuduj treść żądania utworzenia przesyłki"""
+    return {
+        'service': service,
+        'receiver': {
+            'name': receiver_name,
+            'address': receiver_address
+        },
+        'parcel': {'template': parcel_size},
+        'reference': reference
+    }
+
+
+def future_result(future):
+    """Wynik Future bez blokowania: (wynik, błąd) lub (None, None) gdy trwa"""
+    if future is None or not future.done():
+        return None, None
+    error = future.exception()
+    if error is not None:
+        return None, error
+    return future.result(), None
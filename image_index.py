@@ -0,0 +1,214 @@
+"""Perceptualne hasze zdjęć (aHash, dHash, pHash) i indeks near-duplikatów.
+
+To samo uszkodzone urządzenie bywa skanowane kilka razy (inne zdjęcie, inny
+kadr), a SHA-256 tego nie wyłapie. 64-bitowe hasze perceptualne różnią się
+wtedy na kilku bitach, więc szukamy po odległości Hamminga.
+
+Indeks to multi-index hashing: pHash jest dzielony na 4 kawałki po 16 bitów,
+każdy w osobnej zindeksowanej kolumnie SQLite. Jeśli dwa hasze różnią się
+o co najwyżej r bitów, to (zasada szufladkowa) któryś kawałek różni się
+o co najwyżej r // 4 bitów - wystarczy więc sprawdzić kilkanaście wartości
+na kawałek zamiast całej tabeli, a kandydatów zweryfikować dokładnie.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from itertools import combinations
+
+import numpy as np
+
+IMAGE_INDEX_DB_PATH = os.environ.get('GOZ_IMAGE_INDEX_DB', 'image_index.sqlite3')
+DUPLICATE_DISTANCE = int(os.environ.get('GOZ_DUPLICATE_DISTANCE', '6'))
+# reuse - zwróć poprzednią analizę i paszport, flag - analizuj, ale oznacz jako duplikat
+DUPLICATE_POLICY = os.environ.get('GOZ_DUPLICATE_POLICY', 'reuse')
+
+HASH_SIZE = 8
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hashes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sha256 TEXT NOT NULL,
+    dpp_uuid TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    ahash INTEGER NOT NULL,
+    dhash INTEGER NOT NULL,
+    phash INTEGER NOT NULL,
+    c0 INTEGER NOT NULL,
+    c1 INTEGER NOT NULL,
+    c2 INTEGER NOT NULL,
+    c3 INTEGER NOT NULL,
+    analysis TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS image_hashes_c0 ON image_hashes (c0);
+CREATE INDEX IF NOT EXISTS image_hashes_c1 ON image_hashes (c1);
+CREATE INDEX IF NOT EXISTS image_hashes_c2 ON image_hashes (c2);
+CREATE INDEX IF NOT EXISTS image_hashes_c3 ON image_hashes (c3);
+CREATE INDEX IF NOT EXISTS image_hashes_sha ON image_hashes (sha256);
+"""
+
+
+# ============================================
+# HASZE
+# ============================================
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def _dct_matrix(n):
+    k = np.arange(n).reshape(-1, 1)
+    return np.cos(np.pi * (2 * np.arange(n) + 1) * k / (2 * n))
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _grayscale(image, size):
+    from PIL import Image
+    return np.asarray(image.convert('L').resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def average_hash(image):
+    pixels = _grayscale(image, (HASH_SIZE, HASH_SIZE))
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def difference_hash(image):
+    pixels = _grayscale(image, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def perceptual_hash(image):
+    pixels = _grayscale(image, (32, 32))
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:HASH_SIZE, :HASH_SIZE]
+    # Składowa stała (średnia jasność) nie niesie informacji o kształcie
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def image_hashes(source):
+    """Policz aHash, dHash i pHash zdjęcia (plik, bufor lub UploadedFile)
+
+    Zgłasza OSError (PIL.UnidentifiedImageError), gdy to nie jest obraz.
+    """
+    from PIL import Image
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    with Image.open(source) as image:
+        # JPEG dekodowany od razu w zmniejszonej skali - hasze potrzebują 32x32
+        image.draft('L', (64, 64))
+        image.load()
+        hashes = {
+            'ahash': average_hash(image),
+            'dhash': difference_hash(image),
+            'phash': perceptual_hash(image)
+        }
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return hashes
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _to_signed(value):
+    """SQLite INTEGER to 64 bity ze znakiem"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _chunks(value):
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & mask for i in range(CHUNKS)]
+
+
+def _neighbors(value, radius):
+    """Wszystkie wartości kawałka różniące się od `value` o co najwyżej `radius` bitów"""
+    result = [value]
+    for r in range(1, radius + 1):
+        for positions in combinations(range(CHUNK_BITS), r):
+            flipped = value
+            for position in positions:
+                flipped ^= 1 << position
+            result.append(flipped)
+    return result
+
+
+# ============================================
+# INDEKS
+# ============================================
+
+class ImageIndex:
+    """Hasze przeanalizowanych zdjęć z wyszukiwaniem po odległości Hamminga"""
+
+    def __init__(self, path=IMAGE_INDEX_DB_PATH, max_distance=DUPLICATE_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def add(self, hashes, sha256, analysis):
+        self._connect().execute(
+            "INSERT INTO image_hashes (sha256, dpp_uuid, created_at, ahash, dhash, phash, c0, c1, c2, c3, analysis) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha256, analysis['dpp_uuid'], time.time(),
+             _to_signed(hashes['ahash']), _to_signed(hashes['dhash']), _to_signed(hashes['phash']),
+             *_chunks(hashes['phash']), json.dumps(analysis, ensure_ascii=False))
+        )
+
+    def _candidates(self, phash, max_distance):
+        db = self._connect()
+        radius = max_distance // CHUNKS
+        seen = set()
+        for i, chunk in enumerate(_chunks(phash)):
+            values = _neighbors(chunk, radius)
+            marks = ', '.join('?' * len(values))
+            for row in db.execute(
+                f"SELECT id, sha256, dpp_uuid, dhash, phash, analysis FROM image_hashes WHERE c{i} IN ({marks})",
+                values
+            ):
+                if row[0] not in seen:
+                    seen.add(row[0])
+                    yield row
+
+    def find(self, hashes, max_distance=None):
+        """Najbliższe wcześniej przeanalizowane zdjęcie lub None
+
+        Duplikat musi być blisko zarówno w pHash (indeks), jak i w dHash
+        (weryfikacja) - to ogranicza fałszywe trafienia dla podobnych zdjęć
+        różnych przedmiotów.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        best = None
+        for _, sha256, dpp_uuid, dhash, phash, analysis in self._candidates(hashes['phash'], max_distance):
+            distance = hamming(hashes['phash'], _to_unsigned(phash))
+            if distance > max_distance or hamming(hashes['dhash'], _to_unsigned(dhash)) > max_distance:
+                continue
+            if best is None or distance < best['distance']:
+                best = {'sha256': sha256, 'dpp_uuid': dpp_uuid, 'distance': distance, 'analysis': analysis}
+                if distance == 0:
+                    break
+        if best is not None:
+            best['analysis'] = json.loads(best['analysis'])
+        return best
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM image_hashes").fetchone()[0]
@@ -0,0 +1,160 @@
+"""Diagnostyka pamięci procesu (tracemalloc) do szukania wycieków na produkcji.
+
+Włączane przez GOZ_MEMORY_DIAGNOSTICS=1.
+Zbierane są:
+- przyrost pamięci per strona - różnica śledzonej pamięci od startu do końca
+  tego samego przebiegu; wartość przybliżona, bo tracemalloc liczy cały proces
+  i wlicza alokacje przebiegów innych sesji wykonywanych w tym samym czasie,
+- miejsca alokacji (plik:linia) o największym przyroście względem snapshotu bazowego,
+- próbki: liczba sesji, RSS procesu i pamięć śledzona przez tracemalloc.
+Panel operacyjny pokazuje te dane, `log_report` zrzuca je do logu goz.memory.
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+MEMORY_DIAGNOSTICS = os.environ.get('GOZ_MEMORY_DIAGNOSTICS', '') not in ('', '0')
+SAMPLE_INTERVAL = 30.0
+
+logger = logging.getLogger('goz.memory')
+
+# Alokacje samego mechanizmu diagnostyki i importów zaciemniają wynik
+_IGNORED_FILES = frozenset((
+    tracemalloc.__file__,
+    __file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+))
+
+
+def read_rss():
+    """RSS procesu w bajtach (Linux: /proc, inaczej szczytowy RSS z getrusage)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Moduł resource nie istnieje na Windows - import dopiero tutaj
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def count_sessions():
+    """Liczba aktywnych sesji Streamlit w procesie (None poza serwerem)"""
+    from streamlit import runtime
+    if not runtime.exists():
+        return None
+    try:
+        return runtime.get_instance()._session_mgr.num_active_sessions()
+    except AttributeError:
+        return None
+
+
+class MemoryDiagnostics:
+    """Statystyki pamięci wspólne dla procesu"""
+
+    def __init__(self, max_samples=2880):
+        if not tracemalloc.is_tracing():
+            # Jedna ramka stosu wystarcza do grupowania po plik:linia i jest najtańsza
+            tracemalloc.start(1)
+        self._lock = threading.Lock()
+        self.pages = {}
+        self.samples = collections.deque(maxlen=max_samples)
+        self._last_sample = 0.0
+        self._baseline = self._statistics()
+        self.baseline_at = time.time()
+
+    def _statistics(self):
+        """{(plik, linia): (bajty, bloki)} - trzymamy agregaty zamiast całego snapshotu"""
+        return {
+            (stat.traceback[0].filename, stat.traceback[0].lineno): (stat.size, stat.count)
+            for stat in tracemalloc.take_snapshot().statistics('lineno')
+            if stat.traceback[0].filename not in _IGNORED_FILES
+        }
+
+    def begin_run(self, page, state):
+        """Zacznij pomiar przebiegu (niezamknięty pomiar przerwanego przebiegu jest porzucany)"""
+        traced, _ = tracemalloc.get_traced_memory()
+        state['memory_mark'] = (page, traced)
+        self._maybe_sample(traced)
+
+    def end_run(self, state):
+        """Zamknij pomiar przebiegu - czas namysłu użytkownika nie jest wliczany"""
+        mark = state.pop('memory_mark', None)
+        if mark is not None:
+            traced, _ = tracemalloc.get_traced_memory()
+            self._add(mark[0], traced - mark[1])
+
+    def _add(self, page, delta):
+        with self._lock:
+            stats = self.pages.setdefault(page, {'reruns': 0, 'delta': 0, 'max_delta': 0})
+            stats['reruns'] += 1
+            stats['delta'] += delta
+            stats['max_delta'] = max(stats['max_delta'], delta)
+
+    def _maybe_sample(self, traced):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sample < SAMPLE_INTERVAL:
+                return
+            self._last_sample = now
+        sample = {'time': now, 'sessions': count_sessions(), 'rss': read_rss(), 'traced': traced}
+        self.samples.append(sample)
+        logger.info("sessions=%s rss_mb=%.1f traced_mb=%.1f",
+                    sample['sessions'], sample['rss'] / 2 ** 20, traced / 2 ** 20)
+
+    def page_summary(self):
+        """Lista słowników: strona, liczba przebiegów, przyrost pamięci (kB)"""
+        with self._lock:
+            return [
+                {
+                    'page': page,
+                    'reruns': stats['reruns'],
+                    'avg_delta_kb': round(stats['delta'] / stats['reruns'] / 1024, 1),
+                    'total_delta_kb': round(stats['delta'] / 1024, 1),
+                    'max_delta_kb': round(stats['max_delta'] / 1024, 1)
+                }
+                for page, stats in sorted(self.pages.items(), key=lambda item: -item[1]['delta'])
+            ]
+
+    def top_growth(self, limit=15):
+        """Miejsca alokacji o największym przyroście od snapshotu bazowego"""
+        current = self._statistics()
+        growth = []
+        for site, (size, count) in current.items():
+            base_size, base_count = self._baseline.get(site, (0, 0))
+            if size > base_size:
+                growth.append((size - base_size, size, count - base_count, site))
+        growth.sort(reverse=True)
+        return [
+            {
+                'site': f"{filename}:{lineno}",
+                'growth_kb': round(size_diff / 1024, 1),
+                'size_kb': round(size / 1024, 1),
+                'blocks_growth': count_diff
+            }
+            for size_diff, size, count_diff, (filename, lineno) in growth[:limit]
+        ]
+
+    def reset_baseline(self):
+        """Nowy snapshot bazowy - przyrosty liczone od teraz"""
+        self._baseline = self._statistics()
+        self.baseline_at = time.time()
+        with self._lock:
+            self.pages.clear()
+
+    def log_report(self, limit=15):
+        """Zrzuć stan pamięci do logu (do analizy poza panelem)"""
+        traced, peak = tracemalloc.get_traced_memory()
+        logger.warning("memory report: sessions=%s rss_mb=%.1f traced_mb=%.1f peak_mb=%.1f",
+                       count_sessions(), read_rss() / 2 ** 20, traced / 2 ** 20, peak / 2 ** 20)
+        for row in self.page_summary():
+            logger.warning("page=%s reruns=%d avg_delta_kb=%.1f total_delta_kb=%.1f",
+                           row['page'], row['reruns'], row['avg_delta_kb'], row['total_delta_kb'])
+        for row in self.top_growth(limit):
+            logger.warning("growth site=%s growth_kb=%.1f size_kb=%.1f blocks=%+d",
+                           row['site'], row['growth_kb'], row['size_kb'], row['blocks_growth'])
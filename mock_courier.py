@@ -0,0 +1,217 @@
+"""Lokalny serwer-atrapa API kuriera (testy offline i testy obciążeniowe).
+
+Uruchomienie:
+    python mock_courier.py serve --port 8765 --fail-rate 0.1 --latency 0.05
+    python mock_courier.py loadtest --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+
+from courier import AsyncCourierClient, build_shipment
+
+# ============================================
+# ATRAPA ETYKIETY PDF
+# ============================================
+
+def render_label_pdf(shipment):
+    """Zbuduj minimalny, poprawny PDF z numerem śledzenia"""
+    text = f"GOZ.AI - {shipment['tracking_number']} - {shipment['receiver']['name']}"
+    text = text.encode('latin-1', 'replace').decode('latin-1').replace('(', '[').replace(')', ']')
+    stream = f"BT /F1 14 Tf 40 100 Td ({text}) Tj ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 420 200] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# ============================================
+# SERWER
+# ============================================
+
+class MockCourierServer:
+    """Serwer HTTP/1.1 z keep-alive, idempotencją i wstrzykiwaniem błędów"""
+
+    def __init__(self, host='127.0.0.1', port=8765, fail_rate=0.0, latency=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.shipments = {}
+        self.idempotency = {}
+        self.stats = {'requests': 0, 'connections': 0, 'injected_failures': 0}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader, writer):
+        self.stats['connections'] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                self.stats['requests'] += 1
+                status, content_type, payload = await self._route(method, path, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                head = (f"HTTP/1.1 {status} {'OK' if status < 400 else 'ERROR'}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, headers, body):
+        if self.latency:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.latency))
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            self.stats['injected_failures'] += 1
+            return 503, 'application/json', b'{"error": "unavailable"}'
+
+        if method == 'POST' and path == '/v1/shipments':
+            key = headers.get('idempotency-key')
+            if key and key in self.idempotency:
+                shipment = self.shipments[self.idempotency[key]]
+                return 200, 'application/json', json.dumps(shipment).encode('utf-8')
+            data = json.loads(body or b'{}')
+            shipment = {
+                'id': uuid.uuid4().hex,
+                'tracking_number': f"PL-{self.rng.randint(1000000000, 9999999999)}",
+                'status': 'created',
+                'service': data.get('service'),
+                'receiver': data.get('receiver', {'name': ''}),
+                'reference': data.get('reference')
+            }
+            self.shipments[shipment['id']] = shipment
+            if key:
+                self.idempotency[key] = shipment['id']
+            return 201, 'application/json', json.dumps(shipment).encode('utf-8')
+
+        if method == 'GET' and path.startswith('/v1/shipments/') and path.endswith('/label'):
+            shipment = self.shipments.get(path.split('/')[3])
+            if shipment is None:
+                return 404, 'application/json', b'{"error": "not found"}'
+            return 200, 'application/pdf', render_label_pdf(shipment)
+
+        return 404, 'application/json', b'{"error": "not found"}'
+
+
+# ============================================
+# TEST OBCIĄŻENIOWY
+# ============================================
+
+async def load_test(url, requests=1000, concurrency=32, pool_size=16, labels=True):
+    """Wyślij `requests` przesyłek równolegle i zmierz opóźnienia"""
+    client = AsyncCourierClient(url, pool_size=pool_size, backoff_base=0.01)
+    latencies = []
+    errors = 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with gate:
+            start = time.perf_counter()
+            try:
+                shipment = await client.create_shipment(
+                    build_shipment('inpost_locker', f"Serwis {i}", "ul. Testowa 1, Warszawa", f"LOAD-{i}")
+                )
+                if labels:
+                    await client.fetch_label(shipment['id'])
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2)
+    }
+
+
+async def _main(args):
+    server = await MockCourierServer(args.host, args.port, args.fail_rate, args.latency, args.seed).start()
+    if args.command == 'serve':
+        print(f"Mock kuriera nasłuchuje na {server.url}")
+        await asyncio.Event().wait()
+    else:
+        result = await load_test(server.url, args.requests, args.concurrency, args.pool_size)
+        result['server_connections'] = server.stats['connections']
+        result['injected_failures'] = server.stats['injected_failures']
+        print(json.dumps(result, indent=2))
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Atrapa API kuriera GOZ.AI")
+    parser.add_argument('command', choices=['serve', 'loadtest'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--pool-size', type=int, default=16)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
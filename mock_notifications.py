@@ -0,0 +1,141 @@
+"""Lokalne atrapy dostawców powiadomień: serwer SMTP i bramka SMS.
+
+Uruchomienie:
+    python mock_notifications.py --smtp-port 8025 --sms-port 8026 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+
+class MockNotificationServer:
+    """Minimalny serwer SMTP i HTTP-owa bramka SMS zapisujące wiadomości w pamięci"""
+
+    def __init__(self, host='127.0.0.1', smtp_port=8025, sms_port=8026, latency=0.0, fail_rate=0.0, seed=None):
+        self.host = host
+        self.smtp_port = smtp_port
+        self.sms_port = sms_port
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.emails = []
+        self.sms = []
+        self._servers = []
+
+    async def start(self):
+        smtp = await asyncio.start_server(self._handle_smtp, self.host, self.smtp_port)
+        sms = await asyncio.start_server(self._handle_sms, self.host, self.sms_port)
+        self.smtp_port = smtp.sockets[0].getsockname()[1]
+        self.sms_port = sms.sockets[0].getsockname()[1]
+        self._servers = [smtp, sms]
+        return self
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+    @property
+    def sms_url(self):
+        return f"http://{self.host}:{self.sms_port}/v1/sms"
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.latency))
+        return self.fail_rate and self.rng.random() < self.fail_rate
+
+    async def _handle_smtp(self, reader, writer):
+        def reply(line):
+            writer.write((line + '\r\n').encode('ascii'))
+
+        reply('220 goz-mock ESMTP')
+        message = {'from': None, 'to': []}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', 'replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+                if verb in ('EHLO', 'HELO'):
+                    reply('250 goz-mock')
+                elif verb == 'MAIL':
+                    message = {'from': command[10:].strip('<>'), 'to': []}
+                    reply('250 OK')
+                elif verb == 'RCPT':
+                    message['to'].append(command[8:].strip('<>'))
+                    reply('250 OK')
+                elif verb == 'DATA':
+                    reply('354 End data with <CR><LF>.<CR><LF>')
+                    await writer.drain()
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b'.\r\n', b'.\n', b''):
+                            break
+                        lines.append(data_line)
+                    if await self._delay():
+                        reply('451 Temporary failure')
+                    else:
+                        message['data'] = b''.join(lines).decode('utf-8', 'replace')
+                        self.emails.append(message)
+                        reply('250 Queued')
+                elif verb == 'QUIT':
+                    reply('221 Bye')
+                    break
+                else:
+                    reply('250 OK')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_sms(self, reader, writer):
+        try:
+            await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            if await self._delay():
+                status, payload = '503 Service Unavailable', b'{"error": "unavailable"}'
+            else:
+                self.sms.append(json.loads(body))
+                status, payload = '200 OK', b'{"status": "queued"}'
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode('latin-1') + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _main(args):
+    server = await MockNotificationServer(args.host, args.smtp_port, args.sms_port,
+                                          args.latency, args.fail_rate).start()
+    print(f"SMTP: {args.host}:{server.smtp_port} | SMS: {server.sms_url}")
+    while True:
+        await asyncio.sleep(5)
+        print(f"email: {len(server.emails)} | sms: {len(server.sms)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Atrapy dostawców powiadomień GOZ.AI")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--smtp-port', type=int, default=8025)
+    parser.add_argument('--sms-port', type=int, default=8026)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,115 @@
+"""Lokalny serwer-atrapa protokołu Redis (RESP2) do testów współdzielonego cache.
+
+Obsługuje PING, GET, SET (EX/PX), DEL, EXISTS, SELECT, AUTH, FLUSHDB.
+
+Uruchomienie:
+    python mock_redis.py --port 6379
+"""
+
+import argparse
+import asyncio
+import time
+
+
+class MockRedisServer:
+    """Serwer RESP trzymający dane w pamięci"""
+
+    def __init__(self, host='127.0.0.1', port=6379):
+        self.host = host
+        self.port = port
+        self.data = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        if header[:1] != b'*':
+            return header.decode('utf-8').split()
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _get(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, args):
+        command = args[0].upper() if isinstance(args[0], bytes) else args[0].upper().encode()
+        if command == b'PING':
+            return b'+PONG\r\n'
+        if command in (b'SELECT', b'AUTH'):
+            return b'+OK\r\n'
+        if command == b'FLUSHDB':
+            self.data.clear()
+            return b'+OK\r\n'
+        if command == b'GET':
+            value = self._get(args[1])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+        if command == b'SET':
+            expires_at = None
+            options = [a.upper() for a in args[3:]]
+            if b'PX' in options:
+                expires_at = time.time() + int(args[3 + options.index(b'PX') + 1]) / 1000
+            elif b'EX' in options:
+                expires_at = time.time() + int(args[3 + options.index(b'EX') + 1])
+            self.data[args[1]] = (args[2], expires_at)
+            return b'+OK\r\n'
+        if command in (b'DEL', b'EXISTS'):
+            keys = [k for k in args[1:] if self._get(k) is not None]
+            if command == b'DEL':
+                for key in keys:
+                    del self.data[key]
+            return b':%d\r\n' % len(keys)
+        return b"-ERR unknown command\r\n"
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if not args:
+                    break
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _main(args):
+    server = await MockRedisServer(args.host, args.port).start()
+    print(f"Atrapa Redis nasłuchuje na {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Atrapa serwera Redis dla GOZ.AI")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
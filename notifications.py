@@ -0,0 +1,270 @@
+"""Trwała skrzynka nadawcza (outbox) powiadomień email/SMS.
+
+Strony potwierdzeń tylko zapisują powiadomienie w SQLite (szybki INSERT),
+a wątek roboczy wysyła je partiami w tle, z limitem współbieżności
+i ponowieniami. Czas renderowania strony nie zależy od dostawcy.
+
+Uruchomienie samego workera:
+    python notifications.py worker
+"""
+
+import json
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+# ============================================
+# KONFIGURACJA
+# ============================================
+
+OUTBOX_PATH = os.environ.get('GOZ_OUTBOX_PATH', 'outbox.sqlite3')
+SMTP_HOST = os.environ.get('GOZ_SMTP_HOST', '127.0.0.1')
+SMTP_PORT = int(os.environ.get('GOZ_SMTP_PORT', '8025'))
+SMTP_SENDER = os.environ.get('GOZ_SMTP_SENDER', 'powiadomienia@goz.ai')
+SMS_GATEWAY_URL = os.environ.get('GOZ_SMS_GATEWAY_URL', 'http://127.0.0.1:8026/v1/sms')
+
+BATCH_SIZE = 50
+CONCURRENCY = 8
+MAX_ATTEMPTS = 6
+LEASE_SECONDS = 60
+POLL_INTERVAL = 0.5
+SEND_TIMEOUT = 10.0
+
+logger = logging.getLogger('goz.notifications')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT UNIQUE,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+# ============================================
+# OUTBOX (SQLITE)
+# ============================================
+
+class Outbox:
+    """Kolejka powiadomień zapisana na dysku"""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        # Jedno połączenie na wątek; WAL pozwala czytać w trakcie zapisu
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def enqueue(self, channel, recipient, body, subject=None, dedupe_key=None):
+        """Dodaj powiadomienie; ten sam dedupe_key zapisuje się tylko raz"""
+        now = time.time()
+        cur = self._connect().execute(
+            "INSERT OR IGNORE INTO outbox (dedupe_key, channel, recipient, subject, body, next_attempt_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (dedupe_key, channel, recipient, subject, body, now, now)
+        )
+        return cur.rowcount == 1
+
+    def claim(self, limit):
+        """Zarezerwuj partię zaległych powiadomień (z dzierżawą czasową)"""
+        now = time.time()
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            rows = db.execute(
+                "SELECT id, channel, recipient, subject, body, attempts FROM outbox "
+                "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            db.executemany(
+                "UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                [(now + LEASE_SECONDS, row[0]) for row in rows]
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        keys = ('id', 'channel', 'recipient', 'subject', 'body', 'attempts')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def mark_sent(self, ids):
+        self._connect().executemany(
+            "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+            [(time.time(), i) for i in ids]
+        )
+
+    def mark_failed(self, failures):
+        """Zaplanuj ponowienie z wykładniczym opóźnieniem albo porzuć"""
+        now = time.time()
+        updates = []
+        for item, error in failures:
+            attempts = item['attempts'] + 1
+            if attempts >= MAX_ATTEMPTS:
+                updates.append(('dead', attempts, now, str(error)[:500], item['id']))
+            else:
+                delay = random.uniform(0, min(300, 2 ** attempts))
+                updates.append(('pending', attempts, now + delay, str(error)[:500], item['id']))
+        self._connect().executemany(
+            "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            updates
+        )
+
+    def stats(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return dict(rows)
+
+
+# ============================================
+# DOSTAWCY (EMAIL / SMS)
+# ============================================
+
+class SmtpSender:
+    """Wysyłka email przez SMTP"""
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, sender=SMTP_SENDER, timeout=SEND_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.timeout = timeout
+
+    def send(self, item):
+        msg = EmailMessage()
+        msg['From'] = self.sender
+        msg['To'] = item['recipient']
+        msg['Subject'] = item['subject'] or 'GOZ.AI'
+        msg.set_content(item['body'])
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(msg)
+
+
+class SmsGatewaySender:
+    """Wysyłka SMS przez bramkę HTTP (JSON)"""
+
+    def __init__(self, url=SMS_GATEWAY_URL, timeout=SEND_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, item):
+        payload = json.dumps({'to': item['recipient'], 'text': item['body']}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=payload,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+# ============================================
+# WORKER
+# ============================================
+
+class OutboxWorker:
+    """Wątek w tle opróżniający outbox partiami"""
+
+    def __init__(self, outbox, senders=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                 poll_interval=POLL_INTERVAL):
+        self.outbox = outbox
+        self.senders = senders or {'email': SmtpSender(), 'sms': SmsGatewaySender()}
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='outbox-send')
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def notify(self):
+        """Obudź workera od razu po dodaniu powiadomienia"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._pool.shutdown()
+
+    def _send(self, item):
+        sender = self.senders.get(item['channel'])
+        if sender is None:
+            raise ValueError(f"Nieznany kanał: {item['channel']}")
+        sender.send(item)
+
+    def drain_once(self):
+        """Wyślij jedną partię; zwraca liczbę przetworzonych powiadomień"""
+        batch = self.outbox.claim(self.batch_size)
+        if not batch:
+            return 0
+        try:
+            futures = [(item, self._pool.submit(self._send, item)) for item in batch]
+            sent, failed = [], []
+            for item, future in futures:
+                error = future.exception()
+                if error is None:
+                    sent.append(item['id'])
+                else:
+                    failed.append((item, error))
+        except Exception as error:
+            # Partia nierozliczona - ponowienie z opóźnieniem zamiast czekania na koniec dzierżawy
+            self.outbox.mark_failed([(item, error) for item in batch])
+            raise
+        if sent:
+            self.outbox.mark_sent(sent)
+        if failed:
+            self.outbox.mark_failed(failed)
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception:
+                # Błąd jednej partii nie może zatrzymać wysyłki - zadania wrócą po ponowieniu lub dzierżawie
+                logger.exception("outbox: błąd przetwarzania partii")
+                processed = 0
+            if processed < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+if __name__ == '__main__':
+    import sys
+
+    if sys.argv[1:] != ['worker']:
+        print(__doc__)
+        sys.exit(1)
+    worker = OutboxWorker(Outbox()).start()
+    print(f"Worker outbox działa ({OUTBOX_PATH})")
+    try:
+        while True:
+            time.sleep(5)
+            print(worker.outbox.stats())
+    except KeyboardInterrupt:
+        worker.stop()
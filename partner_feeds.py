@@ -0,0 +1,405 @@
+"""Strumieniowy import feedów partnerów (serwisy, kupujący, recyklerzy).
+
+Każdy typ partnera ma osobny plik CSV lub JSONL (także .gz). Wiersze są
+czytane pojedynczo, walidowane względem pól używanych przez interfejs
+i dopisywane do kawałków katalogu, więc pamięć nie rośnie z rozmiarem feedu
+(poza zbiorem identyfikatorów do wykrywania duplikatów).
+
+Układ katalogu (GOZ_CATALOG_DIR):
+    catalog/manifest.json                         - aktualna wersja każdego typu
+    catalog/repair_shops-<wersja>/part-00000.jsonl
+    catalog/repair_shops-<wersja>/rejects.jsonl   - odrzucone wiersze z powodem
+
+Nowa wersja typu jest publikowana podmianą manifestu dopiero po udanym
+imporcie - aplikacja nigdy nie widzi częściowego katalogu. Publikacje są
+serializowane blokadą catalog/manifest.lock, a poprzednia wersja typu jest
+usuwana dopiero przy kolejnej publikacji.
+
+Przykład:
+    python partner_feeds.py ingest repair_shops serwisy.csv.gz --out catalog
+"""
+
+import argparse
+import collections
+import csv
+import gzip
+import io
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+CATALOG_DIR = os.environ.get('GOZ_CATALOG_DIR', 'catalog')
+CHUNK_ROWS = 50000
+PROGRESS_EVERY = 100000
+CATEGORIES = ('electronics', 'furniture', 'appliance')
+
+logger = logging.getLogger('goz.feeds')
+
+_LIST_SEPARATORS = re.compile(r'[|;,]')
+
+
+# ============================================
+# WALIDACJA PÓL
+# ============================================
+
+def _text(value):
+    if value is None or not str(value).strip():
+        raise ValueError("puste pole")
+    return str(value).strip()
+
+
+def _number(low=None, high=None):
+    def parse(value):
+        if isinstance(value, str):
+            value = value.strip().replace(',', '.')
+        number = float(value)
+        if not math.isfinite(number) or (low is not None and number < low) or (high is not None and number > high):
+            raise ValueError(f"wartość {value!r} poza zakresem [{low}, {high}]")
+        return int(number) if number.is_integer() and not isinstance(value, float) else number
+    return parse
+
+
+def _fraction(value):
+    """Udział 0..1; akceptuje też "70%" lub 70"""
+    if isinstance(value, str) and value.strip().endswith('%'):
+        value = value.strip()[:-1]
+        return _number(0, 100)(value) / 100
+    number = float(_number(0, 100)(value))
+    return number / 100 if number > 1 else number
+
+
+def _category(value):
+    category = _text(value).lower()
+    if category not in CATEGORIES:
+        raise ValueError(f"nieznana kategoria {category!r}")
+    return category
+
+
+def _categories(value):
+    if isinstance(value, str):
+        value = [part for part in _LIST_SEPARATORS.split(value) if part.strip()]
+    if not value:
+        raise ValueError("pusta lista kategorii")
+    return sorted({_category(item) for item in value})
+
+
+def _identifier(value):
+    value = _text(value)
+    return int(value) if value.isdigit() else value
+
+
+# Pole -> (parser, wymagane). Klucz unikalności jest używany w kluczach przycisków UI.
+PARTNER_SCHEMAS = {
+    'repair_shops': {
+        'key': 'id',
+        'fields': {
+            'id': (_identifier, True),
+            'name': (_text, True),
+            'address': (_text, True),
+            'rating': (_number(0, 5), True),
+            'response_time': (_text, True),
+            'avg_price': (_number(0), True),
+            'specialization': (_categories, True),
+            'lat': (_number(-90, 90), True),
+            'lon': (_number(-180, 180), True)
+        }
+    },
+    'buyers': {
+        'key': 'name',
+        'fields': {
+            'name': (_text, True),
+            'rating': (_number(0, 5), True),
+            'delivery_time': (_text, True),
+            'offer_percent': (_fraction, True),
+            'category': (_category, True),
+            'address': (_text, False)
+        }
+    },
+    'recyclers': {
+        'key': 'id',
+        'fields': {
+            'id': (_identifier, True),
+            'name': (_text, True),
+            'address': (_text, True),
+            'rating': (_number(0, 5), True),
+            'materials': (_text, True),
+            'price': (_text, True),
+            'accepted': (_categories, True),
+            'certification': (_text, False),
+            'lat': (_number(-90, 90), False),
+            'lon': (_number(-180, 180), False)
+        }
+    }
+}
+
+
+def validate_row(kind, row):
+    """Zwróć (rekord, None) albo (None, (pole, powód odrzucenia))"""
+    if '_invalid' in row:
+        return None, ('_row', row['_reason'])
+    record = {}
+    for field, (parse, required) in PARTNER_SCHEMAS[kind]['fields'].items():
+        value = row.get(field)
+        if value is None or value == '':
+            if required:
+                return None, (field, "brak pola")
+            continue
+        try:
+            record[field] = parse(value)
+        except (TypeError, ValueError) as e:
+            return None, (field, str(e))
+    return record, None
+
+
+# ============================================
+# CZYTANIE FEEDU
+# ============================================
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(path):
+    """Iteruj po wierszach feedu (CSV lub JSONL, rozpoznawane po rozszerzeniu)"""
+    name = path[:-3] if path.endswith('.gz') else path
+    with _open_text(path) as f:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(f)
+        elif name.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        yield {'_invalid': line[:200], '_reason': "niepoprawny JSON"}
+                        continue
+                    if isinstance(row, dict):
+                        yield row
+                    else:
+                        yield {'_invalid': line[:200], '_reason': "wiersz nie jest obiektem JSON"}
+        else:
+            raise ValueError(f"Nieobsługiwany format feedu: {path} (oczekiwano .csv lub .jsonl)")
+
+
+class FeedReport:
+    """Statystyki importu jednego feedu"""
+
+    def __init__(self, kind, source):
+        self.kind = kind
+        self.source = source
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.reasons = collections.Counter()
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+        self.published = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, field):
+        # Licznik po polu (ograniczony), pełny powód trafia do rejects.jsonl
+        self.rejected += 1
+        self.reasons[field] += 1
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'source': self.source,
+            'rows': self.rows,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'seconds': round(self.elapsed, 2),
+            'rows_per_second': round(self.rows_per_second),
+            'published': self.published,
+            'rejects_by_field': dict(self.reasons.most_common())
+        }
+
+
+# ============================================
+# IMPORT DO KATALOGU
+# ============================================
+
+def _manifest_path(out_dir):
+    return os.path.join(out_dir, 'manifest.json')
+
+
+def read_manifest(out_dir=CATALOG_DIR):
+    try:
+        with open(_manifest_path(out_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@contextmanager
+def _manifest_lock(out_dir):
+    """Wyłączny dostęp do manifestu (równoległe importy różnych typów)"""
+    with open(os.path.join(out_dir, 'manifest.lock'), 'a+b') as lock:
+        try:
+            import fcntl
+        except ImportError:
+            # Windows - blokada pierwszego bajtu pliku przez msvcrt
+            import msvcrt
+            while True:
+                try:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_manifest(out_dir, manifest):
+    tmp_path = _manifest_path(out_dir) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _manifest_path(out_dir))
+
+
+class _ChunkWriter:
+    """Dopisuje rekordy do kolejnych plików part-NNNNN.jsonl po `chunk_rows` wierszy"""
+
+    def __init__(self, directory, chunk_rows):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.parts = []
+        self._file = None
+        self._rows = 0
+
+    def write(self, record):
+        if self._file is None or self._rows >= self.chunk_rows:
+            self.close()
+            name = f"part-{len(self.parts):05d}.jsonl"
+            self.parts.append(name)
+            self._file = open(os.path.join(self.directory, name), 'w', encoding='utf-8')
+            self._rows = 0
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._rows += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def ingest_feed(kind, source, out_dir=CATALOG_DIR, chunk_rows=CHUNK_ROWS, max_reject_ratio=0.5):
+    """Zaimportuj feed jednego typu partnera; zwraca FeedReport
+
+    Gdy odrzuconych jest więcej niż `max_reject_ratio` wierszy, nowa wersja
+    nie jest publikowana (prawdopodobnie zły plik lub zmiana formatu u partnera).
+    """
+    if kind not in PARTNER_SCHEMAS:
+        raise ValueError(f"Nieznany typ partnera: {kind} (dostępne: {', '.join(PARTNER_SCHEMAS)})")
+    key_field = PARTNER_SCHEMAS[kind]['key']
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    directory = os.path.join(out_dir, f"{kind}-{version}")
+    os.makedirs(directory)
+
+    report = FeedReport(kind, source)
+    writer = _ChunkWriter(directory, chunk_rows)
+    seen_keys = set()
+    try:
+        with open(os.path.join(directory, 'rejects.jsonl'), 'w', encoding='utf-8') as rejects:
+            for row_no, row in enumerate(read_rows(source), start=1):
+                report.rows += 1
+                record, error = validate_row(kind, row)
+                if record is not None and record[key_field] in seen_keys:
+                    record, error = None, (key_field, f"duplikat {record[key_field]!r}")
+                if record is None:
+                    report.reject(error[0])
+                    rejects.write(json.dumps({'row_no': row_no, 'field': error[0], 'reason': error[1], 'row': row},
+                                             ensure_ascii=False, default=str) + '\n')
+                else:
+                    seen_keys.add(record[key_field])
+                    writer.write(record)
+                    report.accepted += 1
+                if report.rows % PROGRESS_EVERY == 0:
+                    elapsed = time.perf_counter() - report.started_at
+                    logger.info("%s: %d wierszy, %d odrzuconych, %.0f wierszy/s",
+                                kind, report.rows, report.rejected, report.rows / elapsed)
+    except BaseException:
+        writer.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    writer.close()
+    report.elapsed = time.perf_counter() - report.started_at
+
+    if not report.accepted or report.rejected > report.rows * max_reject_ratio:
+        logger.error("%s: odrzucono %d z %d wierszy - wersja nie została opublikowana (%s)",
+                     kind, report.rejected, report.rows, directory)
+        return report
+
+    with _manifest_lock(out_dir):
+        manifest = read_manifest(out_dir)
+        previous = manifest.get(kind)
+        manifest[kind] = {
+            'version': os.path.basename(directory),
+            'parts': writer.parts,
+            'rows': report.accepted,
+            'source': os.path.basename(source),
+            'ingested_at': time.time(),
+            # Poprzednia wersja zostaje do następnej publikacji - czytelnicy mogą jeszcze z niej korzystać
+            'previous': previous['version'] if previous else None
+        }
+        _write_manifest(out_dir, manifest)
+        if previous and previous.get('previous'):
+            shutil.rmtree(os.path.join(out_dir, previous['previous']), ignore_errors=True)
+    report.published = True
+    return report
+
+
+def iter_partners(kind, out_dir=CATALOG_DIR):
+    """Iteruj po rekordach aktualnej wersji typu partnera (kawałek po kawałku)"""
+    entry = read_manifest(out_dir).get(kind)
+    if entry is None:
+        return
+    for part in entry['parts']:
+        with open(os.path.join(out_dir, entry['version'], part), encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Import feedów partnerów GOZ.AI")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help="zaimportuj feed jednego typu partnera")
+    ingest.add_argument('kind', choices=sorted(PARTNER_SCHEMAS))
+    ingest.add_argument('source', help="plik .csv / .jsonl (opcjonalnie .gz)")
+    ingest.add_argument('--out', default=CATALOG_DIR)
+    ingest.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    ingest.add_argument('--max-reject-ratio', type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    os.makedirs(args.out, exist_ok=True)
+    report = ingest_feed(args.kind, args.source, args.out, args.chunk_rows, args.max_reject_ratio)
+    json.dump(report.as_dict(), sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    sys.exit(0 if report.published else 1)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,219 @@
+"""Generowanie cyfrowego paszportu produktu (DPP) jako PDF.
+
+Dokument powstaje w jednym buforze (bytearray z FPDF.output) i jest
+zapisywany na dysk kawałkami przez memoryview - bez kopii pośrednich.
+Paszport zależy tylko od danych analizy, więc plik renderowany jest raz,
+a kolejne pobrania czytają go z dysku; pliki nieużywane dłużej niż
+GOZ_DOWNLOAD_FILE_TTL sekund są usuwane. Eksport zbiorczy składa wiele
+paszportów jako strony jednego dokumentu (wspólne fonty i zasoby),
+dzieląc wynik na pliki po `pages_per_document` stron.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from catalog import get_category_name
+
+PASSPORT_PDF_DIR = os.environ.get('GOZ_PASSPORT_PDF_DIR', 'passport_pdfs')
+STREAM_CHUNK_SIZE = 64 * 1024
+PAGES_PER_DOCUMENT = 500
+# Paszporty i etykiety na dysku żyją tyle co wpisy cache (24 h od ostatniego użycia)
+DOWNLOAD_FILE_TTL = int(os.environ.get('GOZ_DOWNLOAD_FILE_TTL', str(24 * 3600)))
+SWEEP_INTERVAL = 600
+
+FONT = "Helvetica"
+LABEL_WIDTH = 70
+ROW_HEIGHT = 8
+
+
+def _format_date(value):
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return value or '-'
+
+
+def passport_rows(analysis):
+    """Wiersze (etykieta, wartość) paszportu z wyniku analizy"""
+    return [
+        ("Identyfikator DPP:", analysis['dpp_uuid']),
+        ("Marka:", analysis['brand']),
+        ("Kategoria:", get_category_name(analysis['category'])),
+        ("Data Analizy:", _format_date(analysis.get('analysis_date'))),
+        ("Poziom Uszkodzenia:", f"{analysis['damage_level']}/10"),
+        ("Typ Uszkodzenia:", analysis['damage_type']),
+        ("Rekomendacja:", analysis['action']),
+        ("Wartosc rynkowa (przed):", f"{analysis['market_value']} PLN"),
+        ("Szacunkowy koszt naprawy:", f"{analysis['repair_cost']} PLN"),
+        ("Wartosc szacunkowa (po):", f"{analysis['estimated_value']} PLN"),
+        ("Pewnosc AI:", f"{analysis['confidence']*100:.0f}%"),
+        ("Zdjecie (SHA-256):", analysis.get('image_sha256', '-')[:16]),
+    ]
+
+
+def record_rows(passport):
+    """Wiersze paszportu z rekordu rejestru DPP (eksport zbiorczy)"""
+    return [
+        ("Identyfikator DPP:", passport['uuid']),
+        ("Marka:", passport.get('brand', '-')),
+        ("Kategoria:", passport.get('category', '-')),
+        ("Data Analizy:", _format_date(passport.get('analysis_date'))),
+        ("Poziom Uszkodzenia:", f"{passport.get('damage_level', '-')}/10"),
+        ("Typ Uszkodzenia:", passport.get('damage_type', '-')),
+        ("Naprawa mozliwa:", "TAK" if passport.get('repair_feasibility') else "NIE"),
+        ("Szacunkowy koszt naprawy:", f"{passport.get('estimated_repair_cost', 0)} PLN"),
+        ("Pewnosc AI:", f"{passport.get('confidence', 0)*100:.0f}%"),
+        ("Zdjecie:", str(passport.get('evidence_image', '-'))[:23]),
+    ]
+
+
+def _draw_page(pdf, product_name, rows):
+    pdf.add_page()
+
+    # Header
+    pdf.set_fill_color(16, 185, 129)
+    pdf.rect(0, 0, 210, 50, 'F')
+    pdf.set_font(FONT, 'B', 24)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(0, 15, text="GOZ.AI - Paszport Cyfrowy", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.set_font(FONT, '', 10)
+    pdf.cell(0, 10, text="CYFROWY PASZPORT PRODUKTU (DPP)", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+
+    # Content
+    pdf.ln(15)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font(FONT, 'B', 14)
+    pdf.cell(0, 10, text=f"Produkt: {product_name}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    # Etykiety i wartości w dwóch przebiegach - jedna zmiana fontu zamiast dwóch na wiersz
+    top = pdf.get_y()
+    pdf.set_font(FONT, 'B', 10)
+    for i, (label, _) in enumerate(rows):
+        pdf.set_xy(pdf.l_margin, top + i * ROW_HEIGHT)
+        pdf.cell(LABEL_WIDTH, ROW_HEIGHT, text=label)
+    pdf.set_font(FONT, '', 10)
+    for i, (_, value) in enumerate(rows):
+        pdf.set_xy(pdf.l_margin + LABEL_WIDTH, top + i * ROW_HEIGHT)
+        pdf.cell(0, ROW_HEIGHT, text=str(value))
+    pdf.set_xy(pdf.l_margin, top + len(rows) * ROW_HEIGHT)
+
+    # Footer
+    pdf.ln(10)
+    pdf.set_font(FONT, 'I', 8)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(0, 5, text="Dokument wygenerowany przez platforme GOZ.AI", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.cell(0, 5, text="Hostowane: Beyond.pl DC2 Poznan | AI: Bielik-11B", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+
+
+def generate_passport_pdf(analysis):
+    """Generuj cyfrowy paszport jako PDF (bytearray - jedyny bufor dokumentu)"""
+    pdf = FPDF()
+    _draw_page(pdf, analysis['product_name'], passport_rows(analysis))
+    return pdf.output()
+
+
+def iter_chunks(buffer, chunk_size=STREAM_CHUNK_SIZE):
+    """Kawałki bufora jako memoryview (bez kopiowania danych)"""
+    with memoryview(buffer) as view:
+        for offset in range(0, len(view), chunk_size):
+            yield view[offset:offset + chunk_size]
+
+
+def _write_atomic(buffer, path):
+    """Zapisz bufor kawałkami do pliku tymczasowego i podmień plik docelowy"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.pdf-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter_chunks(buffer):
+                out.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+class DownloadDirectory:
+    """Katalog plików do pobrania, z których usuwane są pliki starsze niż `max_age`"""
+
+    def __init__(self, root, max_age=DOWNLOAD_FILE_TTL, sweep_interval=SWEEP_INTERVAL):
+        self.root = root
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def maybe_sweep(self):
+        """Usuń przeterminowane pliki (najwyżej raz na `sweep_interval` sekund)"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return 0
+            self._last_sweep = now
+        return self.sweep(now)
+
+    def sweep(self, now=None):
+        """Usuń pliki nieużywane dłużej niż `max_age`; zwraca liczbę usuniętych"""
+        cutoff = (now or time.time()) - self.max_age
+        removed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    # Usunięty równolegle przez inny proces
+                    pass
+        return removed
+
+
+class PassportPdfFiles(DownloadDirectory):
+    """Paszporty PDF renderowane raz i serwowane z dysku"""
+
+    def __init__(self, root=PASSPORT_PDF_DIR, max_age=DOWNLOAD_FILE_TTL):
+        super().__init__(root, max_age)
+
+    def path(self, analysis):
+        return os.path.join(self.root, f"{analysis['dpp_uuid']}-{analysis.get('image_sha256', '')[:16]}.pdf")
+
+    def ensure(self, analysis):
+        """Ścieżka pliku paszportu; renderuje go przy pierwszym użyciu"""
+        self.maybe_sweep()
+        path = self.path(analysis)
+        try:
+            # Plik w użyciu nie wygasa
+            os.utime(path)
+        except FileNotFoundError:
+            _write_atomic(generate_passport_pdf(analysis), path)
+        return path
+
+
+def write_bulk_pdf(passports, out_prefix, pages_per_document=PAGES_PER_DOCUMENT):
+    """Zapisz paszporty (rekordy rejestru) jako strony dokumentów <prefix>-0001.pdf, ...
+
+    Pamięć jest ograniczona do jednego dokumentu naraz; zwraca (ścieżki, liczba stron).
+    """
+    paths = []
+    pages = 0
+    pdf = None
+    for passport in passports:
+        if pdf is None:
+            pdf = FPDF()
+        _draw_page(pdf, passport.get('product_name', '-'), record_rows(passport))
+        pages += 1
+        if pdf.page >= pages_per_document:
+            paths.append(_write_atomic(pdf.output(), f"{out_prefix}-{len(paths) + 1:04d}.pdf"))
+            pdf = None
+    if pdf is not None:
+        paths.append(_write_atomic(pdf.output(), f"{out_prefix}-{len(paths) + 1:04d}.pdf"))
+    return paths, pages
@@ -0,0 +1,252 @@
+"""Rejestr Cyfrowych Paszportów Produktu (DPP) i strumieniowy eksport.
+
+Eksport czyta rejestr stronami (keyset po id), więc zużycie pamięci jest
+stałe niezależnie od liczby rekordów. Kursor pozwala wznowić przerwany eksport.
+
+Przykład:
+    python passports.py export --format jsonld --gzip --since 2026-01-01 \\
+        --category electronics --out dpp.jsonld.gz
+    python passports.py export --format pdf --out wydruk/dpp   # wydruk/dpp-0001.pdf, ...
+"""
+
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+PASSPORT_DB_PATH = os.environ.get('GOZ_PASSPORT_DB', 'passports.sqlite3')
+PAGE_SIZE = 1000
+EXPORT_FORMATS = ('ndjson', 'jsonld')
+
+JSONLD_CONTEXT = {
+    "@vocab": "https://schema.org/",
+    "dpp": "https://goz.ai/ns/dpp#"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS passports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dpp_uuid TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    category TEXT NOT NULL,
+    action TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS passports_created ON passports (created_at);
+CREATE INDEX IF NOT EXISTS passports_uuid ON passports (dpp_uuid);
+"""
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except ValueError:
+        raise ValueError(f"Niepoprawny kursor eksportu: {cursor!r}")
+
+
+def _timestamp(value):
+    """Zamień datę (ISO, datetime lub liczbę) na znacznik czasu"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class PassportStore:
+    """Trwały rejestr paszportów w SQLite"""
+
+    def __init__(self, path=PASSPORT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+        return db
+
+    def record(self, passport, category, action, created_at=None):
+        """Zapisz paszport; zwraca jego id w rejestrze"""
+        cur = self._connect().execute(
+            "INSERT INTO passports (dpp_uuid, created_at, category, action, payload) VALUES (?, ?, ?, ?, ?)",
+            (passport['uuid'], created_at or time.time(), category, action,
+             json.dumps(passport, ensure_ascii=False))
+        )
+        return cur.lastrowid
+
+    def iter_rows(self, since=None, until=None, category=None, action=None, cursor=None,
+                  limit=None, page_size=PAGE_SIZE):
+        """Iteruj (id, payload) po rekordach spełniających filtry, strona po stronie"""
+        clauses, params = ["id > ?"], []
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(_timestamp(until))
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if action:
+            clauses.append("action = ?")
+            params.append(action)
+        sql = f"SELECT id, payload FROM passports WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+
+        last_id = decode_cursor(cursor)
+        remaining = limit
+        db = self._connect()
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            rows = db.execute(sql, [last_id, *params, size]).fetchall()
+            for row in rows:
+                yield row
+            if len(rows) < size:
+                return
+            last_id = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+
+# ============================================
+# SERIALIZACJA
+# ============================================
+
+def to_jsonld(passport):
+    """Zamień paszport na węzeł JSON-LD (schema.org + słownik dpp)"""
+    return {
+        "@type": "Product",
+        "@id": f"urn:dpp:{passport['uuid']}",
+        "identifier": passport['uuid'],
+        "name": passport.get('product_name'),
+        "brand": {"@type": "Brand", "name": passport.get('brand')},
+        "category": passport.get('category'),
+        "dpp:damageLevel": passport.get('damage_level'),
+        "dpp:damageType": passport.get('damage_type'),
+        "dpp:repairFeasible": passport.get('repair_feasibility'),
+        "dpp:estimatedRepairCost": passport.get('estimated_repair_cost'),
+        "dpp:confidence": passport.get('confidence'),
+        "dpp:evidenceImage": passport.get('evidence_image'),
+        "dateCreated": passport.get('analysis_date')
+    }
+
+
+class ExportState:
+    """Wynik eksportu: liczba rekordów i kursor do wznowienia"""
+
+    def __init__(self, cursor=None):
+        self.count = 0
+        self.cursor = cursor
+
+
+def iter_export(store, fmt='ndjson', state=None, **filters):
+    """Generator fragmentów (bytes) eksportu w formacie NDJSON lub JSON-LD"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Nieznany format eksportu: {fmt}")
+    state = state or ExportState(filters.get('cursor'))
+
+    if fmt == 'jsonld':
+        yield b'{"@context": ' + json.dumps(JSONLD_CONTEXT).encode('utf-8') + b', "@graph": ['
+    separator = b''
+    for row_id, payload in store.iter_rows(**filters):
+        if fmt == 'ndjson':
+            yield payload.encode('utf-8') + b'\n'
+        else:
+            node = to_jsonld(json.loads(payload))
+            yield separator + json.dumps(node, ensure_ascii=False).encode('utf-8')
+            separator = b',\n'
+        state.count += 1
+        state.cursor = encode_cursor(row_id)
+    if fmt == 'jsonld':
+        yield b']}\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """Kompresuj strumień fragmentów do formatu gzip bez buforowania całości"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_passports(store, out, fmt='ndjson', compress=False, **filters):
+    """Zapisz eksport do pliku binarnego; zwraca ExportState"""
+    state = ExportState(filters.get('cursor'))
+    chunks = iter_export(store, fmt, state, **filters)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    for chunk in chunks:
+        out.write(chunk)
+    return state
+
+
+def export_passports_pdf(store, out_prefix, pages_per_document=None, **filters):
+    """Zapisz paszporty jako dokumenty PDF po `pages_per_document` stron; zwraca (ExportState, ścieżki)"""
+    from passport_pdf import PAGES_PER_DOCUMENT, write_bulk_pdf
+
+    state = ExportState(filters.get('cursor'))
+
+    def passports():
+        for row_id, payload in store.iter_rows(**filters):
+            yield json.loads(payload)
+            state.count += 1
+            state.cursor = encode_cursor(row_id)
+
+    paths, _ = write_bulk_pdf(passports(), out_prefix, pages_per_document or PAGES_PER_DOCUMENT)
+    return state, paths
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Eksport paszportów DPP GOZ.AI")
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('--db', default=PASSPORT_DB_PATH)
+    parser.add_argument('--format', choices=EXPORT_FORMATS + ('pdf',), default='ndjson')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--since', help="data od (ISO, włącznie)")
+    parser.add_argument('--until', help="data do (ISO, wyłącznie)")
+    parser.add_argument('--category')
+    parser.add_argument('--action', choices=['SPRZEDAJ', 'NAPRAW', 'ZUTYLIZUJ'])
+    parser.add_argument('--cursor', help="kursor z poprzedniego eksportu")
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--out', help="plik wynikowy (domyślnie stdout); dla pdf prefiks plików")
+    parser.add_argument('--pages-per-document', type=int, help="pdf: liczba stron w jednym pliku")
+    args = parser.parse_args()
+    filters = dict(since=args.since, until=args.until, category=args.category,
+                   action=args.action, cursor=args.cursor, limit=args.limit)
+
+    if args.format == 'pdf':
+        if not args.out:
+            parser.error("--format pdf wymaga --out (prefiks plików)")
+        state, paths = export_passports_pdf(PassportStore(args.db), args.out, args.pages_per_document, **filters)
+        print(f"Wyeksportowano: {state.count} w {len(paths)} plikach PDF | kursor: {state.cursor or '-'}",
+              file=sys.stderr)
+        return
+
+    out = open(args.out, 'wb') if args.out else sys.stdout.buffer
+    try:
+        state = export_passports(PassportStore(args.db), out, args.format, args.gzip, **filters)
+    finally:
+        if args.out:
+            out.close()
+    print(f"Wyeksportowano: {state.count} | kursor: {state.cursor or '-'}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    _main()
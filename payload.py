@@ -0,0 +1,93 @@
+"""Pomiar danych wysyłanych do przeglądarki (bajty na przebieg skryptu i na stronę).
+
+Włączane przez GOZ_MEASURE_PAYLOAD=1. Każda wiadomość ForwardMsg sesji jest
+liczona (ByteSize) zanim trafi do kolejki wysyłki. Wiadomości zastąpione
+referencją do cache przeglądarki (ten sam hash co w poprzednim przebiegu)
+są liczone osobno - to bajty zaoszczędzone przez deduplikację.
+"""
+
+import logging
+import os
+import threading
+
+MEASURE_PAYLOAD = os.environ.get('GOZ_MEASURE_PAYLOAD', '') not in ('', '0')
+
+logger = logging.getLogger('goz.payload')
+
+
+class _SessionTap:
+    """Przechwytuje wiadomości jednej sesji i sumuje ich rozmiar"""
+
+    def __init__(self, meter, sink):
+        self.meter = meter
+        self.sink = sink
+        self.page = None
+        self.bytes = 0
+        self.messages = 0
+        self.cached_refs = 0
+
+    def __call__(self, msg):
+        self.bytes += msg.ByteSize()
+        self.messages += 1
+        if msg.WhichOneof('type') == 'ref_hash':
+            self.cached_refs += 1
+        self.sink(msg)
+
+    def begin_run(self, page):
+        """Zamknij pomiar poprzedniego przebiegu i zacznij nowy"""
+        if self.messages:
+            self.meter.add(self.page, self.bytes, self.messages, self.cached_refs)
+            logger.info("page=%s bytes=%d messages=%d cached_refs=%d",
+                        self.page, self.bytes, self.messages, self.cached_refs)
+        self.page = page
+        self.bytes = 0
+        self.messages = 0
+        self.cached_refs = 0
+
+
+class PayloadMeter:
+    """Statystyki payloadu per strona (wspólne dla procesu)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = {}
+
+    def attach(self, ctx, page, state):
+        """Podłącz licznik sesji do bieżącego kontekstu Streamlit i rozpocznij nowy przebieg
+
+        Kontekst skryptu bywa tworzony na nowo przy każdym przebiegu, dlatego
+        licznik żyje w stanie sesji (`state`), a podpinany jest przy każdym starcie.
+        """
+        tap = state.get('payload_tap')
+        if tap is None:
+            tap = _SessionTap(self, ctx._enqueue)
+            state['payload_tap'] = tap
+        if ctx._enqueue is not tap:
+            tap.sink = ctx._enqueue
+            ctx._enqueue = tap
+        tap.begin_run(page)
+        return tap
+
+    def add(self, page, size, messages, cached_refs):
+        with self._lock:
+            stats = self.pages.setdefault(page, {'reruns': 0, 'bytes': 0, 'messages': 0, 'cached_refs': 0, 'max_bytes': 0})
+            stats['reruns'] += 1
+            stats['bytes'] += size
+            stats['messages'] += messages
+            stats['cached_refs'] += cached_refs
+            stats['max_bytes'] = max(stats['max_bytes'], size)
+
+    def summary(self):
+        """Lista słowników: strona, liczba przebiegów, średnie i maksymalne bajty"""
+        with self._lock:
+            return [
+                {
+                    'page': page,
+                    'reruns': stats['reruns'],
+                    'avg_bytes': stats['bytes'] // stats['reruns'],
+                    'max_bytes': stats['max_bytes'],
+                    'avg_messages': round(stats['messages'] / stats['reruns'], 1),
+                    'cached_refs': stats['cached_refs']
+                }
+                for page, stats in sorted(self.pages.items(), key=lambda item: str(item[0]))
+            ]
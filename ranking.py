@@ -0,0 +1,164 @@
+"""Wielokryterialny ranking partnerów (serwisy, kupujący, recyklerzy).
+
+Teksty typu "2-3 dni" są zamieniane na godziny raz, przy ładowaniu katalogu.
+Dla każdej kategorii trzymamy znormalizowane kolumny ocen (0..1, więcej = lepiej),
+a zapytanie to tylko suma ważona i wybór top-k przez argpartition.
+"""
+
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+DEFAULT_WEIGHTS = {
+    'rating': 0.4,
+    'price': 0.3,
+    'time': 0.2,
+    'distance': 0.1
+}
+RANKING_WEIGHTS = {**DEFAULT_WEIGHTS, **json.loads(os.environ.get('GOZ_RANKING_WEIGHTS', '{}'))}
+
+_UNIT_HOURS = (
+    ('min', 1 / 60),
+    ('godz', 1),
+    ('h', 1),
+    ('tydz', 168),
+    ('tyg', 168),
+    ('dz', 24),
+    ('dni', 24),
+    ('mies', 720),
+)
+_DURATION_RE = re.compile(r'(\d+(?:[.,]\d+)?)(?:\s*[-–]\s*(\d+(?:[.,]\d+)?))?\s*([a-ząćęłńóśźż]*)', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+_IMMEDIATE = ('od ręki', 'od reki', 'od razu', 'natychmiast')
+
+
+def parse_duration_hours(text):
+    """Zamień opis czasu ("24h", "2-3 dni", "1 tydzień") na godziny (środek zakresu)"""
+    if text is None:
+        return math.nan
+    if isinstance(text, (int, float)):
+        return float(text)
+    lowered = text.strip().lower()
+    if any(phrase in lowered for phrase in _IMMEDIATE):
+        return 0.0
+    match = _DURATION_RE.search(lowered)
+    if not match:
+        return math.nan
+    low = float(match.group(1).replace(',', '.'))
+    high = float(match.group(2).replace(',', '.')) if match.group(2) else low
+    unit = match.group(3) or 'h'
+    for prefix, hours in _UNIT_HOURS:
+        if unit.startswith(prefix):
+            return (low + high) / 2 * hours
+    return math.nan
+
+
+def parse_price(value):
+    """Wyciągnij kwotę z liczby lub tekstu ("0 PLN", "ok. 50 zł"); darmowe = 0"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return math.nan
+    match = _NUMBER_RE.search(value)
+    if match:
+        return float(match.group(0).replace(',', '.'))
+    return 0.0 if 'darm' in value.lower() else math.nan
+
+
+def _normalize(values, higher_is_better):
+    """Min-max do 0..1 (1 = najlepszy); brak danych = 0"""
+    values = np.asarray(values, dtype=np.float64)
+    known = ~np.isnan(values)
+    scores = np.zeros(len(values))
+    if not known.any():
+        return scores
+    low, high = values[known].min(), values[known].max()
+    if high == low:
+        scores[known] = 1.0
+        return scores
+    scaled = (values[known] - low) / (high - low)
+    scores[known] = scaled if higher_is_better else 1.0 - scaled
+    return scores
+
+
+class _CategoryColumns:
+    """Kolumnowe dane partnerów jednej kategorii"""
+
+    def __init__(self, partners, rating, price, hours, price_higher_is_better):
+        self.partners = partners
+        # Kryteria bez żadnych danych w tej kategorii nie biorą udziału w wyniku
+        raw = {'rating': (rating, True), 'price': (price, price_higher_is_better), 'time': (hours, False)}
+        self.columns = {
+            name: _normalize(values, higher_is_better)
+            for name, (values, higher_is_better) in raw.items()
+            if not np.isnan(np.asarray(values, dtype=np.float64)).all()
+        }
+        lat = [p.get('lat', math.nan) for p in partners]
+        lon = [p.get('lon', math.nan) for p in partners]
+        self.lat = np.radians(np.asarray(lat, dtype=np.float64))
+        self.lon = np.radians(np.asarray(lon, dtype=np.float64))
+        self.has_geo = bool((~np.isnan(self.lat)).any())
+
+    def distance_scores(self, origin):
+        """Odległość od punktu (przybliżenie równoodległościowe), 1 = najbliżej"""
+        lat0, lon0 = math.radians(origin[0]), math.radians(origin[1])
+        x = (self.lon - lon0) * math.cos(lat0)
+        y = self.lat - lat0
+        return _normalize(np.hypot(x, y), False)
+
+
+class PartnerRanker:
+    """Indeks rankingowy dla jednego typu partnerów"""
+
+    def __init__(self, partners, categories_of, price_of=None, time_of=None, price_higher_is_better=False):
+        grouped = {}
+        for partner in partners:
+            for category in categories_of(partner):
+                grouped.setdefault(category, []).append(partner)
+
+        self._categories = {}
+        for category, members in grouped.items():
+            self._categories[category] = _CategoryColumns(
+                members,
+                [float(p.get('rating', math.nan)) for p in members],
+                [parse_price(price_of(p)) if price_of else math.nan for p in members],
+                [parse_duration_hours(time_of(p)) if time_of else math.nan for p in members],
+                price_higher_is_better
+            )
+
+    def count(self, category):
+        columns = self._categories.get(category)
+        return len(columns.partners) if columns else 0
+
+    def scores(self, category, weights=None, origin=None):
+        """Wynik ważony dla wszystkich partnerów kategorii (wektor numpy)"""
+        columns = self._categories[category]
+        weights = weights or RANKING_WEIGHTS
+        total = np.zeros(len(columns.partners))
+        weight_sum = 0.0
+        for name, column in columns.columns.items():
+            weight = weights.get(name, 0.0)
+            if weight:
+                total += weight * column
+                weight_sum += weight
+        weight = weights.get('distance', 0.0)
+        if weight and origin is not None and columns.has_geo:
+            total += weight * columns.distance_scores(origin)
+            weight_sum += weight
+        return total / weight_sum if weight_sum else total
+
+    def top_k(self, category, k=10, weights=None, origin=None):
+        """Zwróć k najlepszych partnerów kategorii (bez pełnego sortowania)"""
+        if category not in self._categories:
+            return []
+        columns = self._categories[category]
+        scores = self.scores(category, weights, origin)
+        if k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.lexsort((best, -scores[best]))]
+        return [columns.partners[i] for i in best]
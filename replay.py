@@ -0,0 +1,273 @@
+"""Deterministyczne odtwarzanie nagranej sesji jako test regresji wydajności.
+
+Aplikacja jest uruchamiana bez przeglądarki (streamlit.testing AppTest)
+z ziarnem RNG z nagrania, więc analiza i identyfikatory są identyczne
+jak w oryginalnej sesji. Raport zawiera czas serwera dla każdego kroku.
+
+Każde odtworzenie działa na świeżych magazynach w katalogu tymczasowym
+(wszystkie ścieżki GOZ_*), więc wcześniejsze odtworzenia nie wpływają na wynik
+(np. indeks near-duplikatów), a produkcyjne dane nie są zmieniane. Kurier
+i wysyłka powiadomień są zastąpione atrapami - odtworzenie nie zamawia
+przesyłek ani nie wysyła e-maili/SMS.
+
+Przykład:
+    python replay.py recordings/<session_id>.jsonl --fast --report wynik.json
+    python replay.py recordings/<session_id>.jsonl --baseline wynik.json --tolerance 1.5
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import Future
+from unittest import mock
+
+from blob_store import BlobStore
+from session_recording import load_recording
+
+
+class ReplayUpload(io.BytesIO):
+    """Zastępnik UploadedFile zasilany zdjęciem z magazynu blobów"""
+
+    def __init__(self, data, name, file_id):
+        super().__init__(data)
+        self.name = name
+        self.file_id = file_id
+        self.type = 'image/png' if name.lower().endswith('.png') else 'image/jpeg'
+        self.size = len(data)
+
+
+# Moduły trzymające ścieżki magazynów z GOZ_* (czytane przy imporcie) - importowane na nowo
+ISOLATED_MODULES = (
+    'analytics', 'blob_store', 'courier', 'image_index', 'notifications',
+    'passport_pdf', 'passports', 'session_recording', 'shared_cache', 'tracing'
+)
+
+
+def isolated_environment(directory):
+    """Zmienne GOZ_* kierujące wszystkie magazyny do `directory`"""
+    return {
+        'GOZ_ANALYTICS_DB': os.path.join(directory, 'analytics.sqlite3'),
+        'GOZ_BLOB_ROOT': os.path.join(directory, 'blobs'),
+        'GOZ_IMAGE_INDEX_DB': os.path.join(directory, 'image_index.sqlite3'),
+        'GOZ_OUTBOX_PATH': os.path.join(directory, 'outbox.sqlite3'),
+        'GOZ_PASSPORT_DB': os.path.join(directory, 'passports.sqlite3'),
+        'GOZ_PASSPORT_PDF_DIR': os.path.join(directory, 'passport_pdfs'),
+        'GOZ_LABELS_DIR': os.path.join(directory, 'labels'),
+        'GOZ_CACHE_URL': 'local://'
+    }
+
+
+def _completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class ReplayCourierService:
+    """Atrapa kuriera: przesyłki i etykiety tworzone lokalnie, bez sieci"""
+
+    def __init__(self):
+        self._numbers = itertools.count(1)
+        self.shipments = {}
+
+    def create_shipment(self, shipment, idempotency_key=None):
+        number = next(self._numbers)
+        created = dict(shipment, id=f"replay-{number}", tracking_number=f"REPLAY-{number:06d}", status='created')
+        self.shipments[created['id']] = created
+        return _completed(created)
+
+    def fetch_label(self, shipment_id, path=None):
+        from mock_courier import render_label_pdf
+
+        label = render_label_pdf(self.shipments[shipment_id])
+        if path is None:
+            return _completed(label)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(label)
+        return _completed(path)
+
+    def close(self):
+        pass
+
+
+class ReplayOutboxWorker:
+    """Atrapa workera outboxu: powiadomienia zostają w (tymczasowym) outboxie"""
+
+    def __init__(self, outbox, **kwargs):
+        self.outbox = outbox
+
+    def start(self):
+        return self
+
+    def notify(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def _restore_modules(originals):
+    for name in ISOLATED_MODULES:
+        sys.modules.pop(name, None)
+    sys.modules.update(originals)
+
+
+@contextlib.contextmanager
+def isolated_app_state():
+    """Świeże magazyny w katalogu tymczasowym, atrapy kuriera i powiadomień, czyste cache Streamlit"""
+    import streamlit as st
+
+    with contextlib.ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory(prefix='goz-replay-', ignore_cleanup_errors=True))
+        stack.enter_context(mock.patch.dict(os.environ, isolated_environment(directory)))
+        # Odtworzenie nie jest nagrywane ani śledzone
+        os.environ.pop('GOZ_RECORDINGS_DIR', None)
+        os.environ.pop('GOZ_TRACE_PATH', None)
+        # Po wyjściu wracają oryginalne moduły (z produkcyjnymi ścieżkami)
+        originals = {name: sys.modules.pop(name) for name in ISOLATED_MODULES if name in sys.modules}
+        stack.callback(_restore_modules, originals)
+        import courier
+        import notifications
+        stack.enter_context(mock.patch.object(courier, 'CourierService', ReplayCourierService))
+        stack.enter_context(mock.patch.object(notifications, 'OutboxWorker', ReplayOutboxWorker))
+        st.cache_resource.clear()
+        stack.callback(st.cache_resource.clear)
+        yield directory
+
+
+def _find_button(at, event):
+    if event.get('key'):
+        for button in at.button:
+            if button.key == event['key']:
+                return button
+    for button in at.button:
+        if button.label == event['label']:
+            return button
+    return None
+
+
+def replay(path, app_path='app.py', fast=False, timeout=60):
+    """Odtwórz nagranie; zwraca raport z czasami kroków"""
+    from streamlit.testing.v1 import AppTest
+
+    header, events = load_recording(path)
+    # Zdjęcia z nagrania są w produkcyjnym magazynie - otwierany przed izolacją
+    store = BlobStore()
+    upload = {'file': None}
+    steps = []
+
+    patches = [isolated_app_state(), mock.patch('streamlit.file_uploader', lambda *args, **kwargs: upload['file'])]
+    if fast:
+        # Pomija sztuczne opóźnienia paska postępu - mierzymy sam czas obliczeń
+        patches.append(mock.patch('time.sleep'))
+
+    with contextlib.ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+
+        at = AppTest.from_file(app_path, default_timeout=timeout)
+        at.session_state.rng_seed = header['seed']
+        at.query_params['sid'] = f"replay-{uuid.uuid4().hex}"
+
+        def run_step(action, target, expected_page, run):
+            start = time.perf_counter()
+            run()
+            elapsed = (time.perf_counter() - start) * 1000
+            page = at.session_state.current_page
+            errors = [e.message for e in at.exception]
+            steps.append({
+                'step': len(steps),
+                'action': action,
+                'target': target,
+                'ms': round(elapsed, 2),
+                'page': page,
+                'expected_page': expected_page,
+                'ok': not errors and (expected_page is None or page == expected_page),
+                'errors': errors
+            })
+
+        first_page = events[0]['page'] if events else None
+        run_step('start', None, first_page, at.run)
+
+        for i, event in enumerate(events):
+            expected_page = events[i + 1]['page'] if i + 1 < len(events) else None
+            if event['type'] == 'upload':
+                with store.open(event['sha256']) as f:
+                    upload['file'] = ReplayUpload(f.read(), event['name'], event['sha256'])
+                run_step('upload', event['name'], expected_page, at.run)
+            elif event['type'] == 'click':
+                button = _find_button(at, event)
+                if button is None:
+                    steps.append({'step': len(steps), 'action': 'click', 'target': event.get('key') or event['label'],
+                                  'ms': 0.0, 'page': at.session_state.current_page,
+                                  'expected_page': expected_page, 'ok': False,
+                                  'errors': ["Nie znaleziono przycisku - sesja rozjechała się z nagraniem"]})
+                    break
+                run_step('click', event.get('key') or event['label'], expected_page, button.click().run)
+
+    return {
+        'recording': path,
+        'seed': header['seed'],
+        'steps': steps,
+        'total_ms': round(sum(step['ms'] for step in steps), 2),
+        'ok': all(step['ok'] for step in steps)
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=1.5, slack_ms=5.0):
+    """Zwróć kroki wolniejsze niż baseline * tolerance (+ stały margines)"""
+    regressions = []
+    for step, base in zip(report['steps'], baseline['steps']):
+        if step['target'] != base['target']:
+            continue
+        if step['ms'] > base['ms'] * tolerance + slack_ms:
+            regressions.append({'step': step['step'], 'target': step['target'],
+                                'ms': step['ms'], 'baseline_ms': base['ms']})
+    return regressions
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Odtwarzanie nagranych sesji GOZ.AI")
+    parser.add_argument('recording')
+    parser.add_argument('--app', default='app.py')
+    parser.add_argument('--fast', action='store_true', help="pomiń time.sleep (sam czas obliczeń)")
+    parser.add_argument('--report', help="zapisz raport JSON")
+    parser.add_argument('--baseline', help="raport bazowy do porównania")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+
+    report = replay(args.recording, args.app, args.fast)
+    for step in report['steps']:
+        status = 'OK ' if step['ok'] else 'ERR'
+        print(f"{status} #{step['step']:<3} {step['action']:<7} {str(step['target'])[:40]:<40} "
+              f"{step['ms']:>9.1f} ms  -> {step['page']}")
+        for error in step['errors']:
+            print(f"      {error}")
+    print(f"Razem: {report['total_ms']:.1f} ms")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    exit_code = 0 if report['ok'] else 1
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESJA krok #{regression['step']} {regression['target']}: "
+                  f"{regression['ms']:.1f} ms (baseline {regression['baseline_ms']:.1f} ms)")
+        if regressions:
+            exit_code = 1
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,47 @@
+"""Nagrywanie interakcji sesji (kliknięcia, uploady, przejścia stron) do pliku JSONL.
+
+Pierwsza linia to nagłówek z ziarnem RNG sesji, kolejne to zdarzenia:
+    {"type": "session", "session_id": "...", "seed": 123, "started_at": 1700000000.0}
+    {"type": "upload", "t": 1.2, "page": "main", "sha256": "...", "name": "foto.jpg"}
+    {"type": "click", "t": 3.4, "page": "main", "label": "Zaakceptuj X", "key": "repair_7"}
+
+Nagrywanie włącza GOZ_RECORDINGS_DIR; odtwarzanie - replay.py.
+"""
+
+import json
+import os
+import time
+
+RECORDINGS_DIR = os.environ.get('GOZ_RECORDINGS_DIR')
+
+
+class SessionRecorder:
+    """Dopisuje zdarzenia jednej sesji do pliku JSONL"""
+
+    def __init__(self, directory, session_id, seed):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{session_id}.jsonl")
+        self.started_at = time.time()
+        self.last_upload_id = None
+        self._append({
+            'type': 'session',
+            'session_id': session_id,
+            'seed': seed,
+            'started_at': self.started_at
+        })
+
+    def _append(self, event):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def record(self, kind, page, **data):
+        self._append({'type': kind, 't': round(time.time() - self.started_at, 3), 'page': page, **data})
+
+
+def load_recording(path):
+    """Wczytaj nagranie; zwraca (nagłówek, lista zdarzeń)"""
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get('type') != 'session':
+        raise ValueError(f"Plik {path} nie jest nagraniem sesji GOZ.AI")
+    return lines[0], lines[1:]
@@ -0,0 +1,248 @@
+"""Współdzielony cache dla wielu procesów Streamlit (stan sesji po przełączeniu workera).
+
+Backend wybierany przez GOZ_CACHE_URL:
+    local://                     - słownik w procesie (testy, jeden worker)
+    shm:///dev/shm/goz.sqlite3   - pamięć współdzielona jednego hosta (SQLite na tmpfs)
+    redis://host:6379/0          - dowolny serwer mówiący protokołem Redis (RESP)
+"""
+
+import itertools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+CACHE_URL = os.environ.get('GOZ_CACHE_URL', 'local://')
+DEFAULT_TTL = 24 * 3600
+
+# Prefiks formatu wartości: J = JSON (dict/list/liczby/tekst). PDF-y są plikami na dysku
+# (passport_pdf.PassportPdfFiles), więc w cache nie ma już surowych bajtów.
+_JSON = b'J'
+
+
+def serialize(value):
+    """Zamień wartość na bajty do zapisania w cache"""
+    return _JSON + json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def deserialize(data):
+    data = bytes(data) if data is not None else b''
+    if data[:1] != _JSON:
+        # Brak wpisu albo wpis w starym formacie (bajty PDF) - traktowany jak brak
+        return None
+    return json.loads(data[1:].decode('utf-8'))
+
+
+# ============================================
+# BACKENDY
+# ============================================
+
+class LocalCache:
+    """Cache w pamięci procesu (zastępnik do testów)"""
+
+    # Co tyle zapisów usuwane są wygasłe wpisy, których nikt już nie odczyta (porzucone sesje)
+    SWEEP_EVERY = 256
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get_raw(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set_raw(self, key, value, ttl=DEFAULT_TTL):
+        now = time.time()
+        with self._lock:
+            self._data[key] = (value, now + ttl if ttl else None)
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY == 0:
+                expired = [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+                for k in expired:
+                    del self._data[k]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SharedMemoryCache:
+    """Cache dla procesów jednego hosta - SQLite na tmpfs (/dev/shm)"""
+
+    # Co tyle zapisów procesu usuwane są wygasłe wpisy (plik w RAM nie może rosnąć bez końca)
+    SWEEP_EVERY = 256
+
+    def __init__(self, path='/dev/shm/goz_cache.sqlite3'):
+        self.path = path
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        db = self._connect()
+        db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+        db.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            self._local.db = db
+        return db
+
+    def get_raw(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_raw(self, key, value, ttl=DEFAULT_TTL):
+        db = self._connect()
+        now = time.time()
+        db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl if ttl else None)
+        )
+        if next(self._writes) % self.SWEEP_EVERY == 0:
+            db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisCache:
+    """Minimalny klient protokołu Redis (RESP2): GET/SET PX/DEL"""
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rb')
+        if self.password:
+            self._call_once('AUTH', self.password)
+        if self.db:
+            self._call_once('SELECT', str(self.db))
+
+    def _close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+        self._sock = None
+        self._file = None
+
+    def _read_reply(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Serwer Redis zamknął połączenie")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RuntimeError(rest.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            return [self._read_reply() for _ in range(int(rest))]
+        raise ConnectionError(f"Nieznana odpowiedź Redis: {line!r}")
+
+    def _call_once(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            parts.append(b'$%d\r\n' % len(arg))
+            parts.append(arg)
+            parts.append(b'\r\n')
+        self._sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _call(self, *args):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._call_once(*args)
+                except (ConnectionError, OSError):
+                    # Jedno ponowienie po zerwanym połączeniu (np. restart serwera)
+                    self._close()
+                    if attempt:
+                        raise
+
+    def get_raw(self, key):
+        return self._call('GET', key)
+
+    def set_raw(self, key, value, ttl=DEFAULT_TTL):
+        if ttl:
+            self._call('SET', key, value, 'PX', str(int(ttl * 1000)))
+        else:
+            self._call('SET', key, value)
+
+    def delete(self, key):
+        self._call('DEL', key)
+
+
+# ============================================
+# FASADA
+# ============================================
+
+class SharedCache:
+    """Cache wartości JSON niezależny od backendu"""
+
+    def __init__(self, backend, namespace='goz'):
+        self.backend = backend
+        self.namespace = namespace
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key, default=None):
+        value = deserialize(self.backend.get_raw(self._key(key)))
+        return default if value is None else value
+
+    def set(self, key, value, ttl=DEFAULT_TTL):
+        self.backend.set_raw(self._key(key), serialize(value), ttl)
+
+    def delete(self, key):
+        self.backend.delete(self._key(key))
+
+
+def create_cache(url=CACHE_URL):
+    """Zbuduj SharedCache na podstawie adresu backendu"""
+    parts = urlsplit(url)
+    if parts.scheme == 'local':
+        backend = LocalCache()
+    elif parts.scheme == 'shm':
+        backend = SharedMemoryCache(parts.path or '/dev/shm/goz_cache.sqlite3')
+    elif parts.scheme == 'redis':
+        db = int(parts.path.lstrip('/') or 0)
+        backend = RedisCache(parts.hostname or '127.0.0.1', parts.port or 6379, db, parts.password)
+    else:
+        raise ValueError(f"Nieznany backend cache: {url}")
+    return SharedCache(backend)
@@ -0,0 +1,377 @@
+"""Śledzenie drogi przedmiotu od uploadu zdjęcia do potwierdzenia zamówienia.
+
+Jeden przedmiot (zdjęcie) to jeden trace. Każdy przebieg skryptu jest spanem
+"server <strona>" (czas serwera), a przerwa między końcem przebiegu a kolejnym
+kliknięciem - spanem "think <strona>" (czas namysłu użytkownika). Etapy wewnątrz
+przebiegu (kolejka, analiza, PDF) są spanami potomnymi przebiegu. Przebieg
+przerwany przez st.rerun (oznaczony przez `rerun()`) kończy się startem
+następnego; przerwany wyjątkiem lub st.stop - ostatnią zarejestrowaną
+aktywnością (atrybut goz.interrupted), reszta to czas namysłu. Span główny
+"item" obejmuje cały trace i kończy się na stronie potwierdzenia (outcome =
+strona) albo porzuceniem (powrót do menu, nowe zdjęcie).
+
+Kroki ścieżki (atrybut goz.step):
+    upload       - strona główna przed analizą (przebieg z analizą ma span "analysis")
+    selection    - strona główna z wynikiem: przeglądanie zakładek i wybór partnera
+    delivery     - strony *_delivery
+    confirmation - strony *_confirmation_*
+
+Spany są dopisywane do pliku GOZ_TRACE_PATH jako linie OTLP/JSON
+(ExportTraceServiceRequest, jak w file exporterze OpenTelemetry Collectora),
+po jednej linii na przebieg. Analiza offline:
+    python tracing.py summary traces.jsonl
+"""
+
+import argparse
+import collections
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_PATH = os.environ.get('GOZ_TRACE_PATH')
+SERVICE_NAME = 'goz-ai-pilot'
+SCOPE_NAME = 'goz.tracing'
+
+# OTLP: SpanKind i StatusCode
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_UNSET = 0
+STATUS_OK = 1
+
+
+def step_of(page, analysed):
+    """Krok ścieżki przedmiotu dla strony maszyny stanów `current_page`"""
+    if page == 'main':
+        return 'selection' if analysed else 'upload'
+    if page.endswith('_delivery'):
+        return 'delivery'
+    if '_confirmation_' in page:
+        return 'confirmation'
+    return page
+
+
+# ============================================
+# FORMAT OTLP/JSON
+# ============================================
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        # int64 jest w OTLP/JSON zapisywany jako tekst
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+def _decode_attributes(attributes):
+    decoded = {}
+    for attribute in attributes or []:
+        (kind, value), = attribute['value'].items()
+        decoded[attribute['key']] = int(value) if kind == 'intValue' else value
+    return decoded
+
+
+def otlp_span(span):
+    """Span (słownik) w formacie OTLP/JSON"""
+    encoded = {
+        'traceId': span['trace_id'],
+        'spanId': span['span_id'],
+        'name': span['name'],
+        'kind': span['kind'],
+        'startTimeUnixNano': str(span['start']),
+        'endTimeUnixNano': str(span['end']),
+        'attributes': [_attribute(f"goz.{key}", value) for key, value in span['attributes'].items() if value is not None],
+        'status': {'code': span.get('status', STATUS_UNSET)}
+    }
+    if span.get('parent'):
+        encoded['parentSpanId'] = span['parent']
+    return encoded
+
+
+class TraceExporter:
+    """Dopisuje spany do pliku OTLP/JSON (wspólny dla procesu)"""
+
+    def __init__(self, path=TRACE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.resource = {'attributes': [
+            _attribute('service.name', SERVICE_NAME),
+            _attribute('host.name', socket.gethostname()),
+            _attribute('process.pid', os.getpid())
+        ]}
+
+    def export(self, spans):
+        if not spans:
+            return
+        line = json.dumps({'resourceSpans': [{
+            'resource': self.resource,
+            'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': [otlp_span(span) for span in spans]}]
+        }]}, ensure_ascii=False, separators=(',', ':'))
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+# ============================================
+# TRACE SESJI
+# ============================================
+
+def _span_id():
+    return os.urandom(8).hex()
+
+
+class SessionTracer:
+    """Trace bieżącego przedmiotu jednej sesji (żyje w stanie sesji)"""
+
+    def __init__(self, exporter, session_id):
+        self.exporter = exporter
+        self.session_id = session_id
+        self.trace_id = None
+        self.root = None
+        self.upload_id = None
+        self.run = None
+        self.totals = None
+        self._stack = []
+        self._pending = []
+
+    @property
+    def active(self):
+        return self.trace_id is not None
+
+    def _span(self, name, start, end, kind=SPAN_KIND_INTERNAL, parent=None, span_id=None, **attributes):
+        self._pending.append({
+            'trace_id': self.trace_id,
+            'span_id': span_id or _span_id(),
+            'parent': parent or self.root['span_id'],
+            'name': name,
+            'kind': kind,
+            'start': start,
+            'end': end,
+            'attributes': attributes
+        })
+
+    def begin_run(self, page, analysed):
+        """Zamknij poprzedni przebieg (i policz czas namysłu) oraz zacznij nowy"""
+        now = time.time_ns()
+        # Stan na starcie przebiegu to stan, który użytkownik oglądał od końca poprzedniego
+        step = step_of(page, analysed)
+        previous = self.run
+        if previous is not None:
+            if previous['end'] is None and previous['rerun']:
+                # st.rerun - kolejny przebieg startuje od razu, bez namysłu
+                self._end_run(now)
+            elif previous['end'] is None:
+                # Przebieg przerwany wyjątkiem lub st.stop - kończy się na ostatniej zarejestrowanej aktywności
+                self._end_run(previous['last_activity'], interrupted=True)
+            if self.active and previous['end'] < now:
+                self.totals['think'] += now - previous['end']
+                self._span(f"think {page}", previous['end'], now, phase='think', page=page, step=step)
+        self.run = {'span_id': _span_id(), 'page': page, 'step': step, 'start': now, 'end': None,
+                    'last_activity': now, 'action': None, 'rerun': False}
+        self._stack = []
+        if self.active:
+            attributes = self.root['attributes']
+            if step == 'delivery':
+                attributes['tab'] = page[:-len('_delivery')]
+            elif step == 'confirmation':
+                attributes['tab'], _, attributes['delivery'] = page.partition('_confirmation_')
+        self.flush()
+
+    def end_run(self):
+        """Koniec przebiegu (ostatnia linia skryptu); strona potwierdzenia kończy trace"""
+        if self.run is not None and self.run['end'] is None:
+            self._end_run(time.time_ns())
+        self.flush()
+
+    def rerun(self):
+        """Oznacz przebieg jako przerwany przez st.rerun (wywołać tuż przed st.rerun)"""
+        if self.run is not None:
+            self.run['rerun'] = True
+            self._touch()
+
+    def _touch(self):
+        if self.run is not None and self.run['end'] is None:
+            self.run['last_activity'] = time.time_ns()
+
+    def _end_run(self, now, interrupted=False):
+        run = self.run
+        run['end'] = now
+        if not self.active:
+            return
+        self.totals['server'] += now - run['start']
+        self.totals['runs'] += 1
+        self._span(f"server {run['page']}", run['start'], now, kind=SPAN_KIND_SERVER, span_id=run['span_id'],
+                   phase='server', page=run['page'], step=run['step'], action=run['action'],
+                   interrupted=interrupted or None)
+        if run['step'] == 'confirmation':
+            self.finish(run['page'], status=STATUS_OK, end=now)
+
+    def start(self, upload_id, **attributes):
+        """Nowy trace dla nowo wgranego zdjęcia (poprzedni, niedokończony jest porzucony)"""
+        if upload_id == self.upload_id:
+            return False
+        if self.active:
+            # Bieżący przebieg (z nowym zdjęciem) należy już do nowego trace'u
+            self.finish('abandoned', close_run=False)
+        now = time.time_ns()
+        self._touch()
+        self.upload_id = upload_id
+        self.trace_id = os.urandom(16).hex()
+        self.totals = {'server': 0, 'think': 0, 'runs': 0}
+        self.root = {
+            'span_id': _span_id(),
+            # Przebieg z uploadem należy już do trace'u
+            'start': self.run['start'] if self.run is not None and self.run['end'] is None else now,
+            'attributes': {'phase': 'item', 'session_id': self.session_id, **attributes}
+        }
+        return True
+
+    def annotate(self, **attributes):
+        """Dodaj atrybuty do spanu głównego (np. DPP, kategoria)"""
+        if self.active:
+            self.root['attributes'].update(attributes)
+            self._touch()
+
+    def action(self, label):
+        """Zapamiętaj kliknięty przycisk jako atrybut spanu przebiegu"""
+        if self.run is not None:
+            self.run['action'] = label
+            self._touch()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Span potomny bieżącego przebiegu (etap przetwarzania po stronie serwera)"""
+        if not self.active or self.run is None:
+            yield
+            return
+        span_id = _span_id()
+        parent = self._stack[-1] if self._stack else self.run['span_id']
+        start = time.time_ns()
+        self._stack.append(span_id)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            end = time.time_ns()
+            self._touch()
+            if self.active:
+                self._span(name, start, end, parent=parent, span_id=span_id,
+                           phase='stage', step=self.run['step'], **attributes)
+
+    def finish(self, outcome, status=STATUS_UNSET, close_run=True, end=None):
+        """Zamknij trace: span główny z wynikiem i sumami czasu serwera i namysłu"""
+        if not self.active:
+            return
+        now = end or time.time_ns()
+        if close_run and self.run is not None and self.run['end'] is None:
+            # Porzucenie w trakcie przebiegu (np. powrót do menu) - przebieg kończy trace
+            self._end_run(now)
+        root = self.root
+        attributes = dict(root['attributes'], outcome=outcome, runs=self.totals['runs'],
+                          server_ms=round(self.totals['server'] / 1e6, 1),
+                          think_ms=round(self.totals['think'] / 1e6, 1))
+        self._pending.append({
+            'trace_id': self.trace_id,
+            'span_id': root['span_id'],
+            'parent': None,
+            'name': 'item',
+            'kind': SPAN_KIND_INTERNAL,
+            'start': root['start'],
+            'end': now,
+            'attributes': attributes,
+            'status': status
+        })
+        self.flush()
+        self.trace_id = None
+        self.root = None
+        self.totals = None
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        self.exporter.export(pending)
+
+
+# ============================================
+# ANALIZA OFFLINE
+# ============================================
+
+def load_spans(path):
+    """Iteruj po spanach z pliku OTLP/JSON (linia = ExportTraceServiceRequest)"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get('resourceSpans', []):
+                for scope_spans in resource_spans.get('scopeSpans', []):
+                    yield from scope_spans.get('spans', [])
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _stats(durations):
+    return {
+        'count': len(durations),
+        'total_s': round(sum(durations) / 1000, 1),
+        'p50_ms': round(_percentile(durations, 0.5), 1),
+        'p95_ms': round(_percentile(durations, 0.95), 1)
+    }
+
+
+def summarize(paths):
+    """Czas serwera i namysłu per krok, etapy serwera i czasy całych ścieżek"""
+    steps = collections.defaultdict(list)
+    stages = collections.defaultdict(list)
+    items = collections.defaultdict(list)
+    traces = set()
+    for path in paths:
+        for span in load_spans(path):
+            traces.add(span['traceId'])
+            duration = (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e6
+            attributes = _decode_attributes(span.get('attributes'))
+            phase = attributes.get('goz.phase')
+            if phase in ('server', 'think'):
+                steps[(attributes.get('goz.step'), phase)].append(duration)
+            elif phase == 'item':
+                items[attributes.get('goz.outcome')].append(duration)
+            else:
+                stages[span['name']].append(duration)
+
+    total = sum(sum(durations) for durations in steps.values()) or 1.0
+    return {
+        'traces': len(traces),
+        'finished': sum(len(durations) for durations in items.values()),
+        'items': {outcome: _stats(durations) for outcome, durations in sorted(items.items())},
+        'steps': [
+            dict(step=step, phase=phase, share=round(sum(durations) / total, 3), **_stats(durations))
+            for (step, phase), durations in sorted(steps.items(), key=lambda item: -sum(item[1]))
+        ],
+        'stages': {name: _stats(durations) for name, durations in sorted(stages.items())}
+    }
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Analiza trace'ów GOZ.AI (OTLP/JSON)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary = sub.add_parser('summary', help="czas serwera i namysłu per krok ścieżki")
+    summary.add_argument('paths', nargs='+', help="pliki z GOZ_TRACE_PATH")
+    args = parser.parse_args()
+
+    json.dump(summarize(args.paths), sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    _main()
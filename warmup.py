@@ -0,0 +1,179 @@
+"""Rozgrzewka procesu przed przyjęciem ruchu oraz sonda gotowości.
+
+Rozgrzewka importuje ciężkie biblioteki, ładuje katalog i indeksy rankingowe,
+inicjalizuje backend analizy (próbna inferencja) i renderuje próbny paszport
+PDF. Wszystko to trafia do pamięci procesu, więc pierwszy użytkownik na
+świeżym workerze nie płaci za start.
+
+Uruchomienie (zamiast `streamlit run app.py`):
+    python warmup.py --probe-port 8502 -- --server.port 8501
+
+/ready zwraca 200 dopiero gdy rozgrzewka się skończyła i Streamlit odpowiada
+na /_stcore/health; wcześniej 503. /live zwraca 200 od startu procesu.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+READY_PORT = int(os.environ.get('GOZ_READY_PORT', '8502'))
+
+logger = logging.getLogger('goz.warmup')
+
+_lock = threading.Lock()
+_warm = threading.Event()
+timings = {}
+
+
+def _import_libraries():
+    import fpdf  # noqa: F401
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+
+
+def _load_catalog():
+    from catalog import get_catalog
+    return get_catalog()
+
+
+def _build_indexes():
+    from catalog import get_partner_rankers
+    return get_partner_rankers()
+
+
+def _warm_analyzer():
+    from analyzer import warm_up
+    return warm_up()
+
+
+def _render_passport(analysis):
+    from passport_pdf import generate_passport_pdf
+    return generate_passport_pdf(analysis)
+
+
+def _timed(name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info("warmup step=%s ms=%.1f", name, timings[name])
+    return result
+
+
+def run_warmup():
+    """Wykonaj rozgrzewkę (raz na proces); zwraca czasy kroków w ms"""
+    with _lock:
+        if _warm.is_set():
+            return dict(timings)
+        start = time.perf_counter()
+        _timed('imports', _import_libraries)
+        _timed('catalog', _load_catalog)
+        _timed('ranking_indexes', _build_indexes)
+        analysis = _timed('analyzer', _warm_analyzer)
+        _timed('passport_template', _render_passport, analysis)
+        timings['total'] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info("warmup finished ms=%.1f", timings['total'])
+        _warm.set()
+        return dict(timings)
+
+
+def ensure_warm():
+    """Rozgrzej proces, jeśli nie zrobił tego launcher (np. zwykłe `streamlit run`)"""
+    if not _warm.is_set():
+        run_warmup()
+
+
+def is_warm():
+    return _warm.is_set()
+
+
+# ============================================
+# SONDA GOTOWOŚCI
+# ============================================
+
+def _streamlit_healthy(timeout=1.0):
+    from streamlit import config
+    base = config.get_option('server.baseUrlPath').strip('/')
+    path = f"/{base}/_stcore/health" if base else "/_stcore/health"
+    url = f"http://127.0.0.1:{config.get_option('server.port')}{path}"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+class _ProbeHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/live':
+            self._reply(200, {'status': 'alive'})
+        elif self.path == '/ready':
+            if not is_warm():
+                self._reply(503, {'status': 'warming_up', 'timings': dict(timings)})
+            elif not _streamlit_healthy():
+                self._reply(503, {'status': 'starting', 'timings': dict(timings)})
+            else:
+                self._reply(200, {'status': 'ready', 'timings': dict(timings)})
+        else:
+            self._reply(404, {'status': 'not_found'})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReadinessProbe:
+    """Serwer HTTP z /live i /ready działający w wątku w tle"""
+
+    def __init__(self, host='0.0.0.0', port=READY_PORT):
+        self._server = ThreadingHTTPServer((host, port), _ProbeHandler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='goz-readiness', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Rozgrzewka i start serwera GOZ.AI")
+    parser.add_argument('--app', default='app.py')
+    parser.add_argument('--probe-port', type=int, default=READY_PORT)
+    parser.add_argument('streamlit_args', nargs=argparse.REMAINDER,
+                        help="argumenty dla `streamlit run` (po --)")
+    args = parser.parse_args()
+    streamlit_args = args.streamlit_args[1:] if args.streamlit_args[:1] == ['--'] else args.streamlit_args
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    probe = ReadinessProbe(port=args.probe_port).start()
+    logger.info("readiness probe on :%d/ready", probe.port)
+    run_warmup()
+
+    # Streamlit w tym samym procesie - moduły i cache z rozgrzewki są współdzielone
+    from streamlit.web import cli
+    sys.argv = ['streamlit', 'run', args.app, *streamlit_args]
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    # app.py importuje `warmup` - bez aliasu byłby to drugi moduł z nierozgrzaną flagą `_warm`
+    sys.modules.setdefault('warmup', sys.modules[__name__])
+    _main()